@@ -0,0 +1,196 @@
+# app/archive.py
+# Cold-history archival, run as a periodic job:
+#
+#   cd server && python -m app.archive --horizon-days 730
+#
+# Workouts dated before the first day of the month the horizon falls in are moved out of
+# workouts/workout_exercises, one user per transaction. Each (user, month) gets totals per
+# workout name in workout_month_summaries and its raw rows, zlib-compressed, in
+# workout_archives. Rollups are untouched (totals don't change when rows move), rollups.py
+# and trends.py add the archived months to what they read from the hot tables, and the
+# exporter streams archived rows alongside hot ones. The history and single-workout
+# routes only see hot workouts; archived ones can no longer be edited.
+#
+# A workout written later with a date inside an archived month stays hot until the next
+# run, which merges it into that month.
+import argparse
+from datetime import date, timedelta
+import time
+import zlib
+from typing import Optional
+
+import orjson
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from . import config, models, response_cache
+
+
+def month_start(day: date):
+    return day.replace(day=1)
+
+def next_month(month: date):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def cutoff_for(today: date, horizon_days: int):
+    return month_start(today - timedelta(days=horizon_days))
+
+
+def encode_payload(workouts):
+    return zlib.compress(orjson.dumps(workouts), 6)
+
+# [(workout_id, name, date, [(exercise_id, duration), ...]), ...] in (date, id) order
+def decode_payload(payload: bytes):
+    return [
+        (workout_id, name, date.fromisoformat(day), [tuple(entry) for entry in entries])
+        for workout_id, name, day, entries in orjson.loads(zlib.decompress(payload))
+    ]
+
+
+def _add_to_summaries(db: Session, user_id: int, month: date, workouts):
+    by_name = {}
+    for workout_id, name, day, entries in workouts:
+        summary = by_name.get(name)
+        if summary is None:
+            summary = by_name[name] = db.get(models.WorkoutMonthSummary, {"user_id": user_id, "month": month, "workout_name": name})
+            if summary is None:
+                summary = by_name[name] = models.WorkoutMonthSummary(
+                    user_id=user_id, month=month, workout_name=name, workouts=0, exercises=0, minutes=0
+                )
+                db.add(summary)
+        summary.workouts += 1
+        summary.exercises += len(entries)
+        summary.minutes += sum(duration for _, duration in entries)
+        if summary.latest_workout_id is None or (day, workout_id) > (summary.latest_workout_date, summary.latest_workout_id):
+            summary.latest_workout_id = workout_id
+            summary.latest_workout_date = day
+
+def _add_to_archive(db: Session, user_id: int, month: date, workouts):
+    row = db.get(models.WorkoutArchive, {"user_id": user_id, "month": month})
+    if row is None:
+        row = models.WorkoutArchive(user_id=user_id, month=month, workout_count=0, row_count=0)
+        db.add(row)
+        merged = workouts
+    else:
+        merged = sorted(decode_payload(row.payload) + workouts, key=lambda w: (w[2], w[0]))
+    row.payload = encode_payload([(i, name, day.isoformat(), entries) for i, name, day, entries in merged])
+    row.workout_count = len(merged)
+    row.row_count = sum(len(entries) for *_, entries in merged)
+
+# Moves one user's workouts dated before cutoff into the archive; returns how many (does not commit)
+def archive_user(db: Session, user_id: int, cutoff: date):
+    workouts = (
+        db.query(models.Workout)
+        .options(selectinload(models.Workout.workout_exercises))
+        .filter(models.Workout.user_id == user_id, models.Workout.date < cutoff)
+        .order_by(models.Workout.date, models.Workout.id)
+        .with_for_update()
+        .all()
+    )
+    if not workouts:
+        return 0
+    by_month = {}
+    for workout in workouts:
+        entries = [(we.exercise_id, we.duration) for we in sorted(workout.workout_exercises, key=lambda we: we.id)]
+        by_month.setdefault(month_start(workout.date), []).append((workout.id, workout.name, workout.date, entries))
+    for month, month_workouts in by_month.items():
+        _add_to_summaries(db, user_id, month, month_workouts)
+        _add_to_archive(db, user_id, month, month_workouts)
+
+    workout_ids = [w.id for w in workouts]
+    db.query(models.WorkoutExercise).filter(models.WorkoutExercise.workout_id.in_(workout_ids)).delete(synchronize_session=False)
+    db.query(models.Workout).filter(models.Workout.id.in_(workout_ids)).delete(synchronize_session=False)
+    db.flush()
+    return len(workouts)
+
+def archive_all(db: Session, cutoff: date, user_ids=None):
+    if user_ids is None:
+        user_ids = [uid for (uid,) in db.query(models.Workout.user_id).filter(models.Workout.date < cutoff).distinct()]
+    moved = {}
+    for user_id in user_ids:
+        count = archive_user(db, user_id, cutoff)
+        db.commit()
+        db.expunge_all()
+        if count:
+            moved[user_id] = count
+            # Archived workouts drop out of the user's history pages
+            response_cache.invalidate_user(user_id)
+    return moved
+
+
+# Read side, used by rollups.py, trends.py and exporter.py
+
+# (workouts, exercises, minutes, {workout_name: (exercises, minutes)}) over all archived months
+def archived_totals(db: Session, user_id: int):
+    rows = (
+        db.query(
+            models.WorkoutMonthSummary.workout_name,
+            func.sum(models.WorkoutMonthSummary.workouts),
+            func.sum(models.WorkoutMonthSummary.exercises),
+            func.sum(models.WorkoutMonthSummary.minutes),
+        )
+        .filter(models.WorkoutMonthSummary.user_id == user_id)
+        .group_by(models.WorkoutMonthSummary.workout_name)
+        .all()
+    )
+    by_name = {name: (exercises, minutes) for name, _, exercises, minutes in rows if exercises}
+    return (
+        sum(workouts for _, workouts, _, _ in rows),
+        sum(exercises for _, _, exercises, _ in rows),
+        sum(minutes for _, _, _, minutes in rows),
+        by_name,
+    )
+
+# (id, name, date) of the newest archived workout, or None
+def latest_archived(db: Session, user_id: int):
+    row = (
+        db.query(models.WorkoutMonthSummary.latest_workout_id, models.WorkoutMonthSummary.workout_name,
+                 models.WorkoutMonthSummary.latest_workout_date)
+        .filter(models.WorkoutMonthSummary.user_id == user_id)
+        .order_by(models.WorkoutMonthSummary.latest_workout_date.desc(), models.WorkoutMonthSummary.latest_workout_id.desc())
+        .first()
+    )
+    return tuple(row) if row else None
+
+# {month: (minutes, workouts)} from the summaries, for months in [since, before)
+def monthly_totals(db: Session, user_id: int, since: Optional[date] = None, before: Optional[date] = None):
+    query = db.query(
+        models.WorkoutMonthSummary.month,
+        func.sum(models.WorkoutMonthSummary.minutes),
+        func.sum(models.WorkoutMonthSummary.workouts),
+    ).filter(models.WorkoutMonthSummary.user_id == user_id)
+    if since:
+        query = query.filter(models.WorkoutMonthSummary.month >= since)
+    if before:
+        query = query.filter(models.WorkoutMonthSummary.month < before)
+    return {month: (minutes, workouts) for month, minutes, workouts in query.group_by(models.WorkoutMonthSummary.month)}
+
+# Archived workouts dated in [since, before), as decode_payload returns them, oldest first
+def archived_workouts(db: Session, user_id: int, since: Optional[date] = None, before: Optional[date] = None):
+    query = db.query(models.WorkoutArchive.payload).filter(models.WorkoutArchive.user_id == user_id)
+    if since:
+        query = query.filter(models.WorkoutArchive.month >= month_start(since))
+    if before:
+        query = query.filter(models.WorkoutArchive.month < before)
+    for (payload,) in query.order_by(models.WorkoutArchive.month):
+        for workout in decode_payload(payload):
+            if (since is None or workout[2] >= since) and (before is None or workout[2] < before):
+                yield workout
+
+
+if __name__ == "__main__":
+    from app.config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Move workouts older than the horizon into monthly summaries and the compressed archive")
+    parser.add_argument("--horizon-days", type=int, default=config.ARCHIVE_HORIZON_DAYS)
+    parser.add_argument("--user-id", type=int, action="append", help="limit to these users (repeatable)")
+    args = parser.parse_args()
+
+    cutoff = cutoff_for(date.today(), args.horizon_days)
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        moved = archive_all(db, cutoff, user_ids=args.user_id)
+        print(f"archived {sum(moved.values())} workout(s) dated before {cutoff} for {len(moved)} user(s) in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+# app/async_crud.py
+# Async counterparts of the crud functions for an AsyncSession. Each one runs the sync
+# implementation through AsyncSession.run_sync, so the query logic lives only in crud.py
+# while the database I/O is awaited on the event loop instead of holding a threadpool thread.
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, catalog, schema, exercise_search
+
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.run_sync(crud.get_user_by_username, username)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.run_sync(crud.get_user_by_email, email)
+
+async def create_user(db: AsyncSession, user: schema.UserCreate, password_hash: str):
+    return await db.run_sync(crud.create_user, user, password_hash)
+
+async def set_password_hash(db: AsyncSession, user, password_hash: str):
+    return await db.run_sync(crud.set_password_hash, user, password_hash)
+
+async def create_workout(db: AsyncSession, user_id: int, workout_data: schema.WorkoutCreate):
+    return await db.run_sync(crud.create_workout, user_id, workout_data)
+
+async def create_workouts(db: AsyncSession, user_id: int, workouts):
+    return await db.run_sync(crud.create_workouts, user_id, workouts)
+
+async def get_user_workouts(db: AsyncSession, user_id: int, **filters):
+    return await db.run_sync(crud.get_user_workouts, user_id, **filters)
+
+async def get_workout_by_id(db: AsyncSession, workout_id: int, user_id: int):
+    return await db.run_sync(crud.get_workout_by_id, workout_id, user_id)
+
+async def update_workout(db: AsyncSession, workout_id: int, user_id: int, workout_data: schema.WorkoutUpdate):
+    return await db.run_sync(crud.update_workout, workout_id, user_id, workout_data)
+
+async def patch_workout(db: AsyncSession, workout_id: int, user_id: int, patch: schema.WorkoutPatch):
+    return await db.run_sync(crud.patch_workout, workout_id, user_id, patch)
+
+async def get_trends(db: AsyncSession, user_id: int, bucket: str, **filters):
+    return await db.run_sync(crud.get_trends, user_id, bucket, **filters)
+
+async def delete_workout(db: AsyncSession, workout_id: int, user_id: int):
+    return await db.run_sync(crud.delete_workout, workout_id, user_id)
+
+async def get_dashboard_stats(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_dashboard_stats, user_id)
+
+async def get_time_by_workout_name(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_time_by_workout_name, user_id)
+
+async def get_catalog(db: AsyncSession):
+    return await db.run_sync(catalog.get_catalog)
+
+async def search_exercises(db: AsyncSession, q: str, category: str = None, limit: int = 20):
+    return await db.run_sync(exercise_search.search, q, category, limit)
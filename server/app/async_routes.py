@@ -0,0 +1,171 @@
+# app/async_routes.py
+# AsyncSession versions of the request-path routes, used when DB_MODE=async.
+# main.py includes this router ahead of routes.router, so these handlers take over their
+# paths and the remaining routes (import, export, seeding) keep running in sync mode.
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import schema, crud, async_crud, passwords, auth_cache, response_cache, group_commit
+from .config import get_async_db
+from .routes import oauth2_scheme, credentials_exception, token_claims, catalog_response, history_page, batch_response
+
+router = APIRouter()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> auth_cache.Principal:
+    username = token_claims(token)["sub"]
+    user = auth_cache.get_cached_principal(username)
+    if user is None:
+        user = auth_cache.cache_principal(username, await async_crud.get_user_by_username(db, username))
+    if user is None:
+        raise credentials_exception()
+    return user
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> int:
+    claims = token_claims(token)
+    if "uid" in claims:
+        return claims["uid"]
+    return (await get_current_user(token, db)).id
+
+@router.post("/register", response_model=schema.UserOut)
+async def register(user: schema.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await async_crud.get_user_by_email(db, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    password_hash = await passwords.hash_password(user.password)
+    return await async_crud.create_user(db, user, password_hash)
+
+@router.post("/login", response_model=schema.Token)
+async def login(user: schema.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user_by_email(db, user.email)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await passwords.verify_password(user.password, db_user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        await async_crud.set_password_hash(db, db_user, new_hash)
+    return {
+        "access_token": auth_cache.create_access_token(db_user),
+        "token_type": "bearer",
+        "username": db_user.username
+    }
+
+@router.post("/reset-password")
+async def reset_password(data: schema.ResetPasswordData, db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.get_user_by_email(db, data.email)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found.")
+    password_hash = await passwords.hash_password(data.new_password)
+    await async_crud.set_password_hash(db, user, password_hash)
+    return {"message": "Password reset successfully."}
+
+@router.post("/workouts", response_model=schema.WorkoutOut)
+async def create_workout(workout: schema.WorkoutCreate, db: AsyncSession = Depends(get_async_db), user_id: int = Depends(get_current_user_id)):
+    try:
+        if group_commit.enabled():
+            return await group_commit.create_workout(user_id, workout)
+        return await async_crud.create_workout(db, user_id, workout)
+    except crud.UnknownExerciseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.post("/workouts/batch", response_model=schema.WorkoutBatchResult, response_class=ORJSONResponse)
+async def create_workouts(batch: schema.WorkoutBatch, db: AsyncSession = Depends(get_async_db), user_id: int = Depends(get_current_user_id)):
+    created, errors = await async_crud.create_workouts(db, user_id, batch.workouts)
+    return batch_response(created, errors)
+
+@router.get("/workouts", response_model=List[schema.WorkoutOut], response_class=ORJSONResponse)
+async def get_workouts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    async def build():
+        try:
+            workouts, next_cursor = await async_crud.get_user_workouts(
+                db, user_id, limit=limit, cursor=cursor, date_from=date_from, date_to=date_to
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return history_page(workouts, next_cursor)
+    return await response_cache.respond_async(request, user_id, build)
+
+@router.get("/workouts/{workout_id:int}", response_model=schema.WorkoutOut)
+async def get_workout(workout_id: int, db: AsyncSession = Depends(get_async_db), user_id: int = Depends(get_current_user_id)):
+    workout = await async_crud.get_workout_by_id(db, workout_id, user_id)
+    if not workout:
+        raise HTTPException(status_code=404, detail="Workout not found")
+    return workout
+
+@router.put("/workouts/{workout_id:int}", response_model=schema.WorkoutMessage)
+async def update_workout(workout_id: int, workout_data: schema.WorkoutUpdate, db: AsyncSession = Depends(get_async_db), user_id: int = Depends(get_current_user_id)):
+    try:
+        updated_workout = await async_crud.update_workout(db, workout_id, user_id, workout_data)
+    except crud.UnknownExerciseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not updated_workout:
+        raise HTTPException(status_code=404, detail="Workout not found")
+    return {"message": "Workout updated successfully", "workout_id": workout_id}
+
+@router.patch("/workouts/{workout_id:int}", response_model=schema.WorkoutOut)
+async def patch_workout(workout_id: int, patch: schema.WorkoutPatch, db: AsyncSession = Depends(get_async_db), user_id: int = Depends(get_current_user_id)):
+    try:
+        workout = await async_crud.patch_workout(db, workout_id, user_id, patch)
+    except (crud.UnknownExerciseError, crud.InvalidWorkoutPatch) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not workout:
+        raise HTTPException(status_code=404, detail="Workout not found")
+    return workout
+
+@router.delete("/workouts/{workout_id:int}", response_model=schema.WorkoutMessage)
+async def delete_workout(workout_id: int, db: AsyncSession = Depends(get_async_db), user_id: int = Depends(get_current_user_id)):
+    if not await async_crud.delete_workout(db, workout_id, user_id):
+        raise HTTPException(status_code=404, detail="Workout not found")
+    return {"message": "Workout deleted successfully", "workout_id": workout_id}
+
+@router.get("/exercises", response_model=List[schema.ExerciseOut])
+async def get_exercises(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return catalog_response(request, await async_crud.get_catalog(db))
+
+@router.get("/exercises/search", response_model=List[schema.ExerciseOut])
+async def search_exercises(
+    q: str = "",
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await async_crud.search_exercises(db, q, category, limit)
+
+@router.get("/me", response_model=schema.UserOut)
+async def read_users_me(current_user: auth_cache.Principal = Depends(get_current_user)):
+    return current_user
+
+@router.get("/dashboard/stats", response_model=schema.DashboardStats)
+async def get_dashboard_stats(request: Request, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return await response_cache.respond_async(request, user_id, lambda: async_crud.get_dashboard_stats(db, user_id))
+
+@router.get("/dashboard/time-by-type", response_model=List[schema.TimeByType])
+async def time_by_workout_name(request: Request, db: AsyncSession = Depends(get_async_db), user_id: int = Depends(get_current_user_id)):
+    return await response_cache.respond_async(request, user_id, lambda: async_crud.get_time_by_workout_name(db, user_id))
+
+@router.get("/dashboard/trends", response_model=List[schema.TrendBucket])
+async def get_trends(
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    exercise_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    try:
+        return await async_crud.get_trends(db, user_id, bucket, date_from=date_from, date_to=date_to, exercise_id=exercise_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
@@ -0,0 +1,81 @@
+# app/auth_cache.py
+# Process-local caches for the authentication hot path: decoded tokens are memoized
+# until they expire, and user principals are kept in a bounded TTL/LRU cache keyed
+# by the token subject so most requests skip the users lookup.
+from dataclasses import dataclass
+import time
+
+from jose import jwt
+
+from . import config
+from .cache import TTLCache
+
+
+# What routes get as the current user. Deliberately leaves out password_hash.
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    email: str
+    age: int
+    weight: float
+    gender: str
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            age=user.age,
+            weight=user.weight,
+            gender=user.gender,
+        )
+
+
+_users = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL_SECONDS)
+_tokens = TTLCache(config.TOKEN_CACHE_SIZE, 0)
+
+
+def create_access_token(user):
+    claims = {
+        "sub": user.username,
+        "exp": int(time.time()) + config.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+    if config.TOKEN_EMBED_USER_ID:
+        claims["uid"] = user.id
+    return jwt.encode(claims, config.SECRET_KEY, algorithm=config.ALGORITHM)
+
+# Raises JWTError for invalid or expired tokens
+def decode_token(token: str):
+    claims = _tokens.get(token)
+    if claims is None:
+        claims = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+        ttl = claims.get("exp", 0) - time.time()
+        if ttl > 0:
+            _tokens.set(token, claims, ttl=ttl)
+    return claims
+
+# load() is only called on a miss and should return the User row or None
+def get_principal(username: str, load):
+    principal = get_cached_principal(username)
+    if principal is None:
+        principal = cache_principal(username, load())
+    return principal
+
+def get_cached_principal(username: str):
+    return _users.get(username)
+
+# Caches and returns the principal for a freshly loaded User row (None passes through)
+def cache_principal(username: str, user):
+    if user is None:
+        return None
+    principal = Principal.from_user(user)
+    _users.set(username, principal)
+    return principal
+
+def invalidate_user(username: str):
+    _users.pop(username)
+
+def stats():
+    return {"users": _users.stats(), "tokens": _tokens.stats()}
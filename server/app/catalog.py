@@ -0,0 +1,102 @@
+# app/catalog.py
+# Process-local, versioned copy of the exercise catalog. The JSON body for
+# GET /exercises is serialized once per version, and crud resolves exercise names
+# and validates exercise ids against the id map instead of querying.
+#
+# Writers call bump_version() in their transaction and invalidate() after commit.
+# Other processes (seed.py, other workers) notice the new version within
+# CATALOG_RECHECK_SECONDS, or immediately when an id is missing from the map.
+from dataclasses import dataclass
+import threading
+import time
+
+import orjson
+
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+
+@dataclass(frozen=True)
+class CatalogExercise:
+    id: int
+    name: str
+    category: str
+    description: str
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    by_id: dict
+    body: bytes
+    etag: str
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _read_version(db: Session):
+    row = db.get(models.CatalogVersion, 1, populate_existing=True)
+    return row.version if row else 0
+
+def _load(db: Session, version: int):
+    exercises = [
+        CatalogExercise(id=e.id, name=e.name, category=e.category, description=e.description)
+        for e in db.query(models.Exercise).order_by(models.Exercise.id)
+    ]
+    body = orjson.dumps(exercises)
+    return CatalogSnapshot(
+        version=version,
+        by_id={e.id: e for e in exercises},
+        body=body,
+        etag=f'"catalog-{version}"',
+    )
+
+def get_catalog(db: Session, refresh: bool = False):
+    global _snapshot, _checked_at
+    now = time.monotonic()
+    snapshot = _snapshot
+    if snapshot is not None and not refresh and now - _checked_at < config.CATALOG_RECHECK_SECONDS:
+        return snapshot
+    # The lock only guards the swap, never database I/O: under AsyncSession.run_sync a
+    # coroutine holding it across a query would block the event loop thread for everyone.
+    version = _read_version(db)
+    if snapshot is None or snapshot.version != version:
+        snapshot = _load(db, version)
+    with _lock:
+        _snapshot = snapshot
+        _checked_at = now
+    return snapshot
+
+def exercises_by_id(db: Session):
+    return get_catalog(db).by_id
+
+# Returns the ids that don't exist, rechecking the database once before giving up on them
+def missing_exercise_ids(db: Session, exercise_ids):
+    missing = set(exercise_ids) - exercises_by_id(db).keys()
+    if missing:
+        missing -= get_catalog(db, refresh=True).by_id.keys()
+    return sorted(missing)
+
+def exercise_names(db: Session, exercise_ids):
+    by_id = exercises_by_id(db)
+    if not by_id.keys() >= set(exercise_ids):
+        by_id = get_catalog(db, refresh=True).by_id
+    return {exercise_id: by_id[exercise_id].name for exercise_id in exercise_ids if exercise_id in by_id}
+
+# Call inside the transaction that changes the exercises table
+def bump_version(db: Session):
+    updated = db.query(models.CatalogVersion).filter(models.CatalogVersion.id == 1).update(
+        {models.CatalogVersion.version: models.CatalogVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        db.add(models.CatalogVersion(id=1, version=1))
+    db.flush()
+
+def invalidate():
+    global _snapshot
+    with _lock:
+        _snapshot = None
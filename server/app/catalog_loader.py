@@ -0,0 +1,120 @@
+# app/catalog_loader.py
+# Bulk, idempotent exercise catalog loader used by seed.py, POST /seed-exercises and the CLI:
+#
+#   cd server && python -m app.catalog_loader path/to/exercises.csv
+#
+# Reads exercises from a JSON array or a CSV file (name, category, description), fetches
+# the existing catalog in one query and upserts only new or changed rows, in batches, with
+# INSERT ... ON CONFLICT (name_key) on both Postgres and SQLite. Names are matched on
+# models.exercise_name_key, so "Push-ups" updates an existing "Push Ups" and "Café" an
+# existing "Cafe"; only names without a single letter or digit are rejected. Loading the
+# same file twice writes nothing and leaves the catalog version alone.
+import argparse
+import csv
+import json
+import os
+import time
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models, catalog, response_cache
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(__file__), "data", "exercises.json")
+BATCH_ROWS = 5000
+FIELDS = ("name", "category", "description")
+
+
+class CatalogFormatError(ValueError):
+    pass
+
+
+def read_catalog_file(path: str):
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+        if not isinstance(rows, list):
+            raise CatalogFormatError("JSON catalog must be an array of exercises")
+        return rows
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            if "name" not in (reader.fieldnames or []):
+                raise CatalogFormatError("CSV catalog needs a name column")
+            return list(reader)
+    raise CatalogFormatError("Catalog file must be .json or .csv")
+
+def default_catalog():
+    return read_catalog_file(DEFAULT_CATALOG)
+
+
+def _upsert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if insert is None:
+        raise NotImplementedError(f"Catalog upsert is not implemented for {dialect}")
+    statement = insert(models.Exercise.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=["name_key"],
+        set_={field: statement.excluded[field] for field in FIELDS},
+    )
+
+# Returns {"inserted", "updated", "unchanged", "rejected"}; commits when anything changed
+def load_catalog(db: Session, rows, batch_rows: int = BATCH_ROWS):
+    incoming, rejected = {}, 0
+    for row in rows:
+        name = (row.get("name") or "").strip()
+        key = models.exercise_name_key(name)
+        if not key:
+            rejected += 1
+            continue
+        # Later rows win when a file lists the same exercise twice
+        incoming[key] = {
+            "name": name,
+            "category": (row.get("category") or "").strip() or None,
+            "description": (row.get("description") or "").strip() or None,
+            "name_key": key,
+        }
+
+    exercises = models.Exercise.__table__
+    existing = {
+        key: (name, category, description)
+        for key, name, category, description in db.execute(
+            exercises.select().with_only_columns(exercises.c.name_key, exercises.c.name, exercises.c.category, exercises.c.description)
+        )
+    }
+    changes = [row for key, row in incoming.items() if existing.get(key) != (row["name"], row["category"], row["description"])]
+    inserted = sum(1 for row in changes if row["name_key"] not in existing)
+
+    if changes:
+        statement = _upsert_statement(db)
+        for start in range(0, len(changes), batch_rows):
+            db.execute(statement, changes[start:start + batch_rows])
+        catalog.bump_version(db)
+        db.commit()
+        catalog.invalidate()
+        # Cached history pages carry exercise names
+        response_cache.clear()
+    return {
+        "inserted": inserted,
+        "updated": len(changes) - inserted,
+        "unchanged": len(incoming) - len(changes),
+        "rejected": rejected,
+    }
+
+
+if __name__ == "__main__":
+    from app.config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Load or update the exercise catalog from a JSON or CSV file")
+    parser.add_argument("path", nargs="?", default=DEFAULT_CATALOG)
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        result = load_catalog(db, read_catalog_file(args.path), batch_rows=args.batch_rows)
+        print(", ".join(f"{count} {state}" for state, count in result.items()) + f" in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
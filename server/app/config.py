@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 load_dotenv()
@@ -10,6 +11,55 @@ SECRET_KEY = os.getenv("SECRET_KEY", "super-secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Password hashing (see passwords.py). PASSWORD_HASH_WORKERS=0 hashes inline in the request threadpool.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(PASSWORD_HASH_WORKERS, 1) * 8)))
+
+# Authenticated user caching (see auth_cache.py)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+# Put the user id in issued tokens so routes that only need the id skip the users lookup
+TOKEN_EMBED_USER_ID = os.getenv("TOKEN_EMBED_USER_ID", "true").lower() == "true"
+
+# How often a worker checks the database for catalog changes made by other processes
+CATALOG_RECHECK_SECONDS = float(os.getenv("CATALOG_RECHECK_SECONDS", "30"))
+
+# Per-user cache of closed trend buckets (see trends.py)
+TRENDS_CACHE_SIZE = int(os.getenv("TRENDS_CACHE_SIZE", "1024"))
+TRENDS_CACHE_TTL_SECONDS = float(os.getenv("TRENDS_CACHE_TTL_SECONDS", "300"))
+
+# Per-user cache of dashboard and history responses (see response_cache.py); 0 disables it
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+
+# Group commit for POST /workouts (see group_commit.py): concurrent creates arriving within
+# GROUP_COMMIT_WINDOW_MS share one transaction. 0 disables it and each request commits alone.
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "0"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "200"))
+# Creates queued beyond this are rejected with a 429
+GROUP_COMMIT_MAX_PENDING = int(os.getenv("GROUP_COMMIT_MAX_PENDING", "2000"))
+# How long a request waits for its create to be written before answering 503
+GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("GROUP_COMMIT_TIMEOUT_SECONDS", "30"))
+
+# app.archive moves workouts dated before the month this many days back out of the hot tables
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "730"))
+
+# Requests slower than this are logged with the SQL they issued (0 disables the log)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# /metrics and /auth/cache-stats expose internals, so they answer 404 unless this is set
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+
+# "sync" serves every route from the threadpool with a Session. "async" serves the
+# request-path routes with an AsyncSession instead (see async_routes.py).
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+def async_database_url(url: str):
+    url = make_url(url)
+    driver = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}.get(url.get_backend_name())
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}") if driver else url
+
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,3 +71,17 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Only built in async mode so sync deployments don't need asyncpg/aiosqlite installed
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,9 +1,8 @@
 # app/create_tables.py
-#creates the database tables based on the models defined in the app
-from app.models import Base
+#creates the database tables by applying the schema migrations (see migrations.py)
 from app.config import engine
+from app.migrations import upgrade
 
-print("Creating all tables...")
-Base.metadata.create_all(bind=engine)
-print("Database created sucessfully.")
-
+print("Applying migrations...")
+applied = upgrade(engine)
+print(f"Database ready ({len(applied)} migration(s) applied).")
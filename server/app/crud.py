@@ -1,18 +1,28 @@
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from . import models, schema
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import and_, bindparam, or_
+from sqlalchemy.orm import Session, selectinload
+from . import models, schema, rollups, auth_cache, catalog, trends, response_cache
 
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def create_user(db: Session, user: schema.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+class UnknownExerciseError(ValueError):
+    def __init__(self, exercise_ids):
+        super().__init__(f"Unknown exercise_id(s): {', '.join(map(str, exercise_ids))}")
+        self.exercise_ids = exercise_ids
+
+def validate_exercise_ids(db: Session, exercises):
+    missing = catalog.missing_exercise_ids(db, {we.exercise_id for we in exercises})
+    if missing:
+        raise UnknownExerciseError(missing)
+
+# password_hash comes from passwords.hash_password; crud never hashes inline
+def create_user(db: Session, user: schema.UserCreate, password_hash: str):
     db_user = models.User(
         username=user.username,
         email=user.email,
-        password_hash=hashed_password,
+        password_hash=password_hash,
         age=user.age,
         weight=user.weight,
         gender=user.gender
@@ -20,89 +30,320 @@ def create_user(db: Session, user: schema.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    auth_cache.invalidate_user(db_user.username)
     return db_user
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def set_password_hash(db: Session, user: models.User, password_hash: str):
+    user.password_hash = password_hash
+    db.commit()
+    auth_cache.invalidate_user(user.username)
+    return user
 
 def create_workout(db: Session, user_id: int, workout_data: schema.WorkoutCreate):
-    workout = models.Workout(name=workout_data.name, date=workout_data.date, user_id=user_id)
+    validate_exercise_ids(db, workout_data.exercises)
+    stats = rollups.ensure_user_rollups(db, user_id)
+    workout = models.Workout(
+        name=workout_data.name,
+        date=workout_data.date,
+        user_id=user_id,
+        workout_exercises=[
+            models.WorkoutExercise(exercise_id=we.exercise_id, duration=we.duration)
+            for we in workout_data.exercises
+        ]
+    )
     db.add(workout)
     db.flush()
-    for we in workout_data.exercises:
-        db_we = models.WorkoutExercise(
-            workout_id=workout.id,
-            exercise_id=we.exercise_id,
-            duration=we.duration
+    rollups.record_workout_created(db, stats, workout, [we.duration for we in workout_data.exercises])
+    # Serialized before the commit expires the instance, so the response needs no reload
+    created = serialize_workouts(db, [workout])[0]
+    db.commit()
+    trends.invalidate(user_id, [workout_data.date])
+    response_cache.invalidate_user(user_id)
+    return created
+
+# Adds one user's workouts to the current transaction (does not commit) and returns them
+# serialized. Used by POST /workouts/batch and the group-commit writer; exercise ids must
+# already be validated. Callers commit, then call workouts_written with the workouts' dates.
+def add_workouts(db: Session, user_id: int, workouts):
+    stats = rollups.ensure_user_rollups(db, user_id)
+    rows = [
+        models.Workout(
+            name=w.name,
+            date=w.date,
+            user_id=user_id,
+            workout_exercises=[models.WorkoutExercise(exercise_id=we.exercise_id, duration=we.duration) for we in w.exercises]
         )
-        db.add(db_we)
+        for w in workouts
+    ]
+    db.add_all(rows)
+    db.flush()
+    rollups.record_workouts_imported(
+        db, stats,
+        [(row.id, row.name, row.date) for row in rows],
+        [(row.name, we.duration) for row in rows for we in row.workout_exercises],
+    )
+    return serialize_workouts(db, rows)
+
+def workouts_written(user_id: int, dates):
+    trends.invalidate(user_id, dates)
+    response_cache.invalidate_user(user_id)
+
+# Writes the valid workouts of a batch in one transaction. Returns (created, errors): errors
+# are (index, message) for workouts that reference unknown exercises; the rest are written.
+def create_workouts(db: Session, user_id: int, workouts):
+    missing = set(catalog.missing_exercise_ids(db, {we.exercise_id for w in workouts for we in w.exercises}))
+    valid, errors = [], []
+    for index, workout in enumerate(workouts):
+        unknown = sorted({we.exercise_id for we in workout.exercises} & missing)
+        if unknown:
+            errors.append((index, str(UnknownExerciseError(unknown))))
+        else:
+            valid.append(workout)
+    if not valid:
+        return [], errors
+    created = add_workouts(db, user_id, valid)
     db.commit()
-    return workout
+    workouts_written(user_id, {w.date for w in valid})
+    return created, errors
 
-def get_user_workouts(db: Session, user_id: int):
-    workouts = db.query(models.Workout).filter(models.Workout.user_id == user_id).all()
-    
-    result = []
-    for workout in workouts:
-        exercises = []
-        total_duration = 0
-
-        for we in workout.workout_exercises:
-            exercise = db.query(models.Exercise).filter(models.Exercise.id == we.exercise_id).first()
-            exercises.append({
-                "name": exercise.name,
-                "duration": we.duration,
-                "exercise_id": we.exercise_id  
-            })
-            total_duration += we.duration
-
-        result.append({
-            "id": workout.id,
-            "name": workout.name,
-            "date": workout.date,
-            "user_id": workout.user_id,
-            "exercises": exercises,
-            "total_duration": total_duration
+# names maps exercise_id -> name (see catalog.exercise_names)
+def serialize_workout(workout: models.Workout, names: dict):
+    exercises = []
+    total_duration = 0
+    for we in workout.workout_exercises:
+        exercises.append({
+            "id": we.id,
+            "name": names.get(we.exercise_id),
+            "duration": we.duration,
+            "exercise_id": we.exercise_id
         })
+        total_duration += we.duration
+
+    return {
+        "id": workout.id,
+        "name": workout.name,
+        "date": workout.date,
+        "user_id": workout.user_id,
+        "exercises": exercises,
+        "total_duration": total_duration
+    }
+
+# Cursors are "<date>_<id>" of the last workout on the previous page
+def encode_workout_cursor(workout: models.Workout):
+    return f"{workout.date.isoformat()}_{workout.id}"
+
+def decode_workout_cursor(cursor: str):
+    date_part, id_part = cursor.split("_", 1)
+    return datetime.strptime(date_part, "%Y-%m-%d").date(), int(id_part)
+
+# Workouts with their exercises in two queries, whatever the page size; names come from the catalog
+def workout_history_query(db: Session, user_id: int):
+    return (
+        db.query(models.Workout)
+        .options(selectinload(models.Workout.workout_exercises))
+        .filter(models.Workout.user_id == user_id)
+    )
+
+def serialize_workouts(db: Session, workouts):
+    names = catalog.exercise_names(db, {we.exercise_id for w in workouts for we in w.workout_exercises})
+    return [serialize_workout(w, names) for w in workouts]
+
+def get_user_workouts(db: Session, user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None,
+                      date_from: Optional[date] = None, date_to: Optional[date] = None):
+    query = workout_history_query(db, user_id)
+    if date_from:
+        query = query.filter(models.Workout.date >= date_from)
+    if date_to:
+        query = query.filter(models.Workout.date <= date_to)
+    if cursor:
+        cursor_date, cursor_id = decode_workout_cursor(cursor)
+        query = query.filter(or_(
+            models.Workout.date < cursor_date,
+            and_(models.Workout.date == cursor_date, models.Workout.id < cursor_id)
+        ))
 
-    return result
+    query = query.order_by(models.Workout.date.desc(), models.Workout.id.desc())
+    if limit:
+        # Fetch one extra row to know whether another page exists
+        query = query.limit(limit + 1)
+    workouts = query.all()
+
+    next_cursor = None
+    if limit and len(workouts) > limit:
+        workouts = workouts[:limit]
+        next_cursor = encode_workout_cursor(workouts[-1])
+
+    return serialize_workouts(db, workouts), next_cursor
+
+def get_workout_by_id(db: Session, workout_id: int, user_id: int):
+    workout = workout_history_query(db, user_id).filter(models.Workout.id == workout_id).first()
+    if not workout:
+        return None
+    return serialize_workouts(db, [workout])[0]
+
+def get_dashboard_stats(db: Session, user_id: int):
+    stats = rollups.get_user_rollups(db, user_id)
+    return {
+        "total_workouts": stats.total_workouts,
+        "total_exercises": stats.total_exercises,
+        "total_time_spent_minutes": stats.total_minutes,
+        "latest_workout": {
+            "name": stats.latest_workout_name,
+            "date": stats.latest_workout_date.strftime("%Y-%m-%d") if stats.latest_workout_date else None
+        }
+    }
+
+def get_time_by_workout_name(db: Session, user_id: int):
+    rollups.get_user_rollups(db, user_id)
+    results = (
+        db.query(models.UserWorkoutTypeStats.workout_name, models.UserWorkoutTypeStats.minutes)
+        .filter(models.UserWorkoutTypeStats.user_id == user_id, models.UserWorkoutTypeStats.exercise_count > 0)
+        .all()
+    )
+    return [{"workoutType": r[0], "timeSpent": r[1]} for r in results]
+
+def get_trends(db: Session, user_id: int, bucket: str = "week", date_from: Optional[date] = None,
+               date_to: Optional[date] = None, exercise_id: Optional[int] = None):
+    return trends.get_trends(db, user_id, bucket, date_from=date_from, date_to=date_to, exercise_id=exercise_id)
 
 def delete_workout(db: Session, workout_id: int, user_id: int):
     workout = db.query(models.Workout).filter_by(id=workout_id, user_id=user_id).first()
     if not workout:
         return None
+    stats = rollups.ensure_user_rollups(db, user_id)
+    durations = [we.duration for we in workout.workout_exercises]
+    workout_date = workout.date
     db.delete(workout)
+    rollups.record_workout_deleted(db, stats, workout, durations)
     db.commit()
+    trends.invalidate(user_id, [workout_date])
+    response_cache.invalidate_user(user_id)
     return workout        
 
-    return result
+# Work out the minimal changes that turn the existing rows into the submitted list.
+# Rows are matched on exercise_id first; leftover rows are repurposed before anything is
+# inserted or deleted. Returns (updates [{"id", ...changed columns}], inserts [(exercise_id, duration)], delete_ids).
+def diff_workout_exercises(existing, submitted):
+    unmatched_rows = {}
+    for we in sorted(existing, key=lambda we: we.id):
+        unmatched_rows.setdefault(we.exercise_id, []).append(we)
+
+    updates, unmatched = [], []
+    for exercise_id, duration in submitted:
+        rows = unmatched_rows.get(exercise_id)
+        if rows:
+            we = rows.pop(0)
+            if we.duration != duration:
+                updates.append({"id": we.id, "duration": duration})
+        else:
+            unmatched.append((exercise_id, duration))
+
+    leftover = sorted((we for rows in unmatched_rows.values() for we in rows), key=lambda we: we.id)
+    for we, (exercise_id, duration) in zip(leftover, unmatched):
+        updates.append({"id": we.id, "exercise_id": exercise_id, "duration": duration})
+    inserts = unmatched[len(leftover):]
+    delete_ids = [we.id for we in leftover[len(unmatched):]]
+    return updates, inserts, delete_ids
+
+# One statement per kind of change, and none when there is nothing to do
+def apply_workout_exercise_changes(db: Session, workout_id: int, updates, inserts, delete_ids):
+    table = models.WorkoutExercise.__table__
+    for columns in {tuple(sorted(u)) for u in updates}:
+        batch = [u for u in updates if tuple(sorted(u)) == columns]
+        db.execute(
+            table.update().where(table.c.id == bindparam("_id")).values({c: bindparam(c) for c in columns if c != "id"}),
+            [{**{c: u[c] for c in columns if c != "id"}, "_id": u["id"]} for u in batch],
+        )
+    if inserts:
+        db.execute(table.insert(), [
+            {"workout_id": workout_id, "exercise_id": exercise_id, "duration": duration}
+            for exercise_id, duration in inserts
+        ])
+    if delete_ids:
+        db.execute(table.delete().where(table.c.id.in_(delete_ids)))
 
 def update_workout(db: Session, workout_id: int, user_id: int, workout_data: schema.WorkoutUpdate):
+    validate_exercise_ids(db, workout_data.exercises)
     # Get the existing workout
-    workout = db.query(models.Workout).filter_by(id=workout_id, user_id=user_id).first()
+    workout = workout_history_query(db, user_id).filter(models.Workout.id == workout_id).first()
     if not workout:
         return None
+    stats = rollups.ensure_user_rollups(db, user_id)
+    old_name = workout.name
+    old_date = workout.date
+    old_durations = [we.duration for we in workout.workout_exercises]
     
-    # Update workout basic info
+    # Update workout basic info (no UPDATE is issued when nothing changed)
     workout.name = workout_data.name
     workout.date = workout_data.date
     
-    # Delete existing workout exercises
-    db.query(models.WorkoutExercise).filter_by(workout_id=workout_id).delete()
-    
-    # Add new exercises
-    for we in workout_data.exercises:
-        db_we = models.WorkoutExercise(
-            workout_id=workout.id,
-            exercise_id=we.exercise_id,
-            duration=we.duration
-        )
-        db.add(db_we)
+    submitted = [(we.exercise_id, we.duration) for we in workout_data.exercises]
+    updates, inserts, delete_ids = diff_workout_exercises(workout.workout_exercises, submitted)
+    apply_workout_exercise_changes(db, workout.id, updates, inserts, delete_ids)
     
+    rollups.record_workout_updated(db, stats, workout, old_name, old_durations, [duration for _, duration in submitted])
+    db.commit()
+    trends.invalidate(user_id, [old_date, workout_data.date])
+    response_cache.invalidate_user(user_id)
+    db.refresh(workout)
+    return workout
+
+class InvalidWorkoutPatch(ValueError):
+    pass
+
+# Partial edit: only the given fields and the referenced exercise rows are touched.
+# Returns the serialized workout as it stands after the edit.
+def patch_workout(db: Session, workout_id: int, user_id: int, patch: schema.WorkoutPatch):
+    workout = workout_history_query(db, user_id).filter(models.Workout.id == workout_id).first()
+    if not workout:
+        return None
+    rows = {we.id: we for we in workout.workout_exercises}
+    changes = patch.exercises or []
+    row_ids = [change.id for change in changes if change.id is not None]
+    if len(row_ids) != len(set(row_ids)):
+        raise InvalidWorkoutPatch("Each exercise entry can only be changed once per request")
+    for change in changes:
+        if change.id is not None and change.id not in rows:
+            raise InvalidWorkoutPatch(f"Workout has no exercise entry {change.id}")
+        if change.id is None and (change.remove or change.exercise_id is None or change.duration is None):
+            raise InvalidWorkoutPatch("New exercise entries need exercise_id and duration")
+    validate_exercise_ids(db, [c for c in changes if c.exercise_id is not None and not c.remove])
+
+    stats = rollups.ensure_user_rollups(db, user_id)
+    old_name = workout.name
+    old_date = workout.date
+    old_durations = [we.duration for we in workout.workout_exercises]
+    if patch.name is not None:
+        workout.name = patch.name
+    if patch.date is not None:
+        workout.date = patch.date
+
+    durations = {we_id: we.duration for we_id, we in rows.items()}
+    updates, inserts, delete_ids = [], [], []
+    for change in changes:
+        if change.id is None:
+            inserts.append((change.exercise_id, change.duration))
+        elif change.remove:
+            delete_ids.append(change.id)
+            durations.pop(change.id, None)
+        else:
+            update = {"id": change.id}
+            if change.exercise_id is not None and change.exercise_id != rows[change.id].exercise_id:
+                update["exercise_id"] = change.exercise_id
+            if change.duration is not None and change.duration != rows[change.id].duration:
+                update["duration"] = change.duration
+                durations[change.id] = change.duration
+            if len(update) > 1:
+                updates.append(update)
+    apply_workout_exercise_changes(db, workout.id, updates, inserts, delete_ids)
+
+    new_durations = list(durations.values()) + [duration for _, duration in inserts]
+    rollups.record_workout_updated(db, stats, workout, old_name, old_durations, new_durations)
     db.commit()
+    trends.invalidate(user_id, [old_date, patch.date or old_date])
+    response_cache.invalidate_user(user_id)
     db.refresh(workout)
-    return workout
\ No newline at end of file
+    return serialize_workouts(db, [workout])[0]
\ No newline at end of file
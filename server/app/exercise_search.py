@@ -0,0 +1,249 @@
+# app/exercise_search.py
+# In-memory search index over the exercise catalog for GET /exercises/search.
+#
+# Names are normalized to casefolded letters and digits without accents (any script), so
+# "pushups", "Push ups" and "PUSH-UPS" all match "Push-ups" and "cafe" matches "Café". Prefixes of the whole name and of the name from each later word
+# on are indexed in rank order for autocomplete, and trigrams of the whole name catch
+# mid-word matches and typos in longer queries. Results are ranked name prefix (exact
+# first, then shorter names) > later-word prefix; only when neither matches are names
+# ranked by the share of the query's trigrams they contain. Short queries have too few
+# trigrams for that, so if it finds nothing each word is padded with spaces the way
+# pg_trgm pads them and matched against the padded words of each name ("plnk" shares
+# "  p", " pl" and "nk " with "Plank").
+#
+# An empty query lists names alphabetically, from lists kept in order as the index syncs.
+#
+# The index follows catalog.py: when the catalog version changes only the exercises that
+# were added, changed or removed are re-indexed.
+import bisect
+import math
+import re
+import threading
+import unicodedata
+
+from sqlalchemy.orm import Session
+
+from . import catalog
+
+MAX_PREFIX = 12
+# Share of the query's trigrams a name must contain to count as a near miss
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+# Same rule as models.exercise_name_key
+_non_alnum = re.compile(r"[\W_]+")
+
+
+def _fold(text: str):
+    return unicodedata.normalize("NFKD", text or "").casefold()
+
+def normalize(text: str):
+    return _non_alnum.sub("", _fold(text))
+
+def words(text: str):
+    return [w for w in _non_alnum.split(_fold(text)) if w]
+
+def trigrams(compact: str):
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+# Trigrams of each word padded with two spaces in front and one behind; the spaces keep
+# them apart from trigrams() of the compact name
+def word_trigrams(text: str):
+    return {gram for word in words(text) for gram in trigrams(f"  {word} ")}
+
+def _bitmask(slots, size: int):
+    bits = bytearray((size + 7) // 8)
+    for slot in slots:
+        bits[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(bits, "little")
+
+def _lowest_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ExerciseIndex:
+    def __init__(self):
+        self.version = None
+        # id -> (exercise, compact name, name tails from each word on, category)
+        self._entries = {}
+        # prefix -> ids in rank order (shorter names first), for the whole name and for the
+        # name from each later word on ("arm pl" finds "Single-Arm Plank")
+        self._name_prefixes = {}
+        self._tail_prefixes = {}
+        # Trigrams and categories as bitmasks over slots, so counting the trigrams each name
+        # shares with a query is a handful of big-int operations instead of a loop over ids
+        self._slots = []
+        self._slot_of = {}
+        self._trigram_masks = {}
+        self._category_masks = {}
+        # Alphabetical ids for an empty query, overall (key None) and per category
+        self._browse = {None: []}
+        self._lock = threading.Lock()
+
+    def _rank(self, exercise_id: int):
+        compact = self._entries[exercise_id][1]
+        return len(compact), compact, exercise_id
+
+    def _alphabetical(self, exercise_id: int):
+        return self._entries[exercise_id][1], exercise_id
+
+    @staticmethod
+    def _keys(exercise):
+        compact = normalize(exercise.name)
+        tails, offset = [], 0
+        for word in words(exercise.name):
+            tails.append(compact[offset:])
+            offset += len(word)
+        name_prefixes = {compact[:n] for n in range(1, min(len(compact), MAX_PREFIX) + 1)}
+        tail_prefixes = {tail[:n] for tail in tails[1:] for n in range(1, min(len(tail), MAX_PREFIX) + 1)}
+        return compact, tails, name_prefixes, tail_prefixes - name_prefixes
+
+    @staticmethod
+    def _grams(exercise, compact: str):
+        return trigrams(compact) | word_trigrams(exercise.name)
+
+    def _remove(self, exercise_id: int):
+        exercise = self._entries[exercise_id][0]
+        compact, _, name_prefixes, tail_prefixes = self._keys(exercise)
+        for keys, index in ((name_prefixes, self._name_prefixes), (tail_prefixes, self._tail_prefixes)):
+            for key in keys:
+                index[key].remove(exercise_id)
+                if not index[key]:
+                    del index[key]
+        slot = self._slot_of.pop(exercise_id)
+        self._slots[slot] = None
+        clear = ~(1 << slot)
+        for gram in self._grams(exercise, compact):
+            self._trigram_masks[gram] &= clear
+        category = self._entries[exercise_id][3]
+        self._category_masks[category] &= clear
+        for key in (None, category):
+            self._browse[key].remove(exercise_id)
+        del self._entries[exercise_id]
+
+    # exercises must be in rank order
+    def _add_all(self, exercises):
+        new_postings = ({}, {})
+        slots_by_trigram, slots_by_category = {}, {}
+        for exercise in exercises:
+            compact, tails, name_prefixes, tail_prefixes = self._keys(exercise)
+            category = normalize(exercise.category)
+            self._entries[exercise.id] = (exercise, compact, tails, category)
+            for keys, postings in zip((name_prefixes, tail_prefixes), new_postings):
+                for key in keys:
+                    postings.setdefault(key, []).append(exercise.id)
+            slot = len(self._slots)
+            self._slots.append(exercise.id)
+            self._slot_of[exercise.id] = slot
+            for gram in self._grams(exercise, compact):
+                slots_by_trigram.setdefault(gram, []).append(slot)
+            slots_by_category.setdefault(category, []).append(slot)
+            for key in (None, category):
+                bisect.insort(self._browse.setdefault(key, []), exercise.id, key=self._alphabetical)
+        for index, postings in zip((self._name_prefixes, self._tail_prefixes), new_postings):
+            for key, ids in postings.items():
+                existing = index.get(key)
+                if existing is None:
+                    index[key] = ids
+                else:
+                    for exercise_id in ids:
+                        bisect.insort(existing, exercise_id, key=self._rank)
+        size = len(self._slots)
+        for masks, new_slots in ((self._trigram_masks, slots_by_trigram), (self._category_masks, slots_by_category)):
+            for key, slots in new_slots.items():
+                masks[key] = masks.get(key, 0) | _bitmask(slots, size)
+
+    # Brings the index in line with a catalog snapshot, touching only what changed
+    def sync(self, version, by_id: dict):
+        with self._lock:
+            if version == self.version:
+                return
+            stale = [i for i, entry in self._entries.items() if by_id.get(i) != entry[0]]
+            for exercise_id in stale:
+                self._remove(exercise_id)
+            added = [exercise for exercise_id, exercise in by_id.items() if exercise_id not in self._entries]
+            # Slots follow rank order, so near misses with equal scores come out shortest first
+            added.sort(key=lambda e: (len(normalize(e.name)), normalize(e.name), e.id))
+            self._add_all(added)
+            self.version = version
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, q: str, category: str = None, limit: int = 20):
+        query = normalize(q)
+        wanted_category = normalize(category) if category else None
+        with self._lock:
+            def allowed(exercise_id):
+                return wanted_category is None or self._entries[exercise_id][3] == wanted_category
+
+            if not query:
+                return [self._entries[i][0] for i in self._browse.get(wanted_category, ())[:limit]]
+
+            # Prefix matches come out of the postings already in rank order
+            found = []
+            key = query[:MAX_PREFIX]
+            for postings, matches in (
+                (self._name_prefixes.get(key, ()), lambda entry: entry[1].startswith(query)),
+                (self._tail_prefixes.get(key, ()), lambda entry: any(tail.startswith(query) for tail in entry[2])),
+            ):
+                for exercise_id in postings:
+                    if len(found) == limit:
+                        return [self._entries[i][0] for i in found]
+                    if exercise_id in found or not allowed(exercise_id):
+                        continue
+                    if len(query) > MAX_PREFIX and not matches(self._entries[exercise_id]):
+                        continue
+                    found.append(exercise_id)
+
+            # Nothing starts with the query: fall back to substrings and near misses,
+            # most shared trigrams first, then to near misses word by word
+            if not found:
+                scope = self._category_masks.get(wanted_category, 0) if wanted_category else -1
+                for grams in (trigrams(query), word_trigrams(q)):
+                    self._near_misses(grams, scope, found, limit)
+                    if found:
+                        break
+            return [self._entries[i][0] for i in found]
+
+    # Appends ids of names in scope sharing enough of grams to found, most shared first
+    def _near_misses(self, grams, scope: int, found: list, limit: int):
+        if not grams:
+            return
+        # Bit-sliced counter: planes[i] holds bit i of every slot's shared-trigram count
+        planes = []
+        for gram in grams:
+            carry = self._trigram_masks.get(gram, 0)
+            for i, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[i], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+        floor = max(1, math.ceil(MIN_TRIGRAM_SIMILARITY * len(grams)))
+        for count in range(len(grams), floor - 1, -1):
+            if count >> len(planes):
+                continue
+            level = scope
+            for i, plane in enumerate(planes):
+                level &= plane if count >> i & 1 else ~plane
+            for slot in _lowest_bits(level):
+                exercise_id = self._slots[slot]
+                if exercise_id not in found:
+                    found.append(exercise_id)
+                    if len(found) == limit:
+                        return
+
+
+_index = ExerciseIndex()
+
+
+def get_index(db: Session):
+    snapshot = catalog.get_catalog(db)
+    _index.sync(snapshot.version, snapshot.by_id)
+    return _index
+
+def search(db: Session, q: str, category: str = None, limit: int = 20):
+    return get_index(db).search(q, category, limit)
@@ -0,0 +1,98 @@
+# app/exporter.py
+# Streaming workout export for GET /workouts/export. Rows come off a server-side
+# cursor (yield_per) in fixed-size partitions and are encoded as they arrive, so
+# memory stays flat however long the history is. The columns line up with what
+# importer.py accepts (workout_ref groups a workout's rows). Archived months (see
+# archive.py) are decoded one at a time and streamed ahead of the hot rows.
+import csv
+import io
+from datetime import date, timedelta
+import itertools
+from typing import Optional
+
+import orjson
+from sqlalchemy import select
+
+from . import archive, catalog, config, models
+
+EXPORT_PARTITION_ROWS = 1000
+EXPORT_COLUMNS = ["workout_ref", "name", "date", "exercise_id", "exercise_name", "duration"]
+
+
+def export_query(user_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    workouts = models.Workout.__table__
+    workout_exercises = models.WorkoutExercise.__table__
+    exercises = models.Exercise.__table__
+    query = (
+        select(
+            workouts.c.id, workouts.c.name, workouts.c.date,
+            workout_exercises.c.exercise_id, exercises.c.name, workout_exercises.c.duration,
+        )
+        .select_from(
+            workouts
+            .outerjoin(workout_exercises, workout_exercises.c.workout_id == workouts.c.id)
+            .outerjoin(exercises, exercises.c.id == workout_exercises.c.exercise_id)
+        )
+        .where(workouts.c.user_id == user_id)
+        .order_by(workouts.c.date, workouts.c.id, workout_exercises.c.id)
+    )
+    if date_from:
+        query = query.where(workouts.c.date >= date_from)
+    if date_to:
+        query = query.where(workouts.c.date <= date_to)
+    return query
+
+def _encode_csv(rows, header: bool):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for workout_id, name, workout_date, exercise_id, exercise_name, duration in rows:
+        writer.writerow([workout_id, name, workout_date.isoformat() if workout_date else "", exercise_id, exercise_name, duration])
+    return buffer.getvalue()
+
+# orjson writes dates as YYYY-MM-DD itself
+def _encode_ndjson(rows):
+    lines = []
+    for workout_id, name, workout_date, exercise_id, exercise_name, duration in rows:
+        lines.append(orjson.dumps({
+            "workout_ref": workout_id,
+            "name": name,
+            "date": workout_date,
+            "exercise_id": exercise_id,
+            "exercise_name": exercise_name,
+            "duration": duration,
+        }, option=orjson.OPT_APPEND_NEWLINE))
+    return b"".join(lines)
+
+# Export rows for archived workouts, in the same shape as export_query's
+def archived_rows(db, user_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    before = date_to + timedelta(days=1) if date_to else None
+    workouts = archive.archived_workouts(db, user_id, date_from, before)
+    while True:
+        partition = list(itertools.islice(workouts, EXPORT_PARTITION_ROWS))
+        if not partition:
+            return
+        names = catalog.exercise_names(db, {exercise_id for *_, entries in partition for exercise_id, _ in entries})
+        rows = []
+        for workout_id, name, workout_date, entries in partition:
+            for exercise_id, duration in entries or [(None, None)]:
+                rows.append((workout_id, name, workout_date, exercise_id, names.get(exercise_id), duration))
+        yield rows
+
+# Sync generator; Starlette iterates it in the threadpool. It owns its session because
+# it outlives the request's get_db dependency.
+def stream_export(user_id: int, fmt: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    if fmt == "csv":
+        # Send the header before the query runs so the client gets its first byte immediately
+        yield _encode_csv([], header=True)
+    db = config.SessionLocal()
+    try:
+        connection = db.connection(execution_options={"yield_per": EXPORT_PARTITION_ROWS})
+        for rows in archived_rows(db, user_id, date_from, date_to):
+            yield _encode_csv(rows, header=False) if fmt == "csv" else _encode_ndjson(rows)
+        result = connection.execute(export_query(user_id, date_from, date_to))
+        for partition in result.partitions():
+            yield _encode_csv(partition, header=False) if fmt == "csv" else _encode_ndjson(partition)
+    finally:
+        db.close()
@@ -0,0 +1,190 @@
+# app/group_commit.py
+# Optional group-commit writer for POST /workouts, enabled with GROUP_COMMIT_WINDOW_MS > 0.
+#
+# Route handlers submit their workout and wait on a future. A single writer thread takes
+# the first queued create, keeps collecting for the window (or until GROUP_COMMIT_MAX_BATCH),
+# and writes the lot with crud.add_workouts in one transaction, so a burst of posts costs
+# one commit instead of hundreds. Every caller still gets its own workout or error back:
+# unknown exercise ids fail just that caller, and if the shared transaction fails the
+# batch is retried one workout per transaction. At most GROUP_COMMIT_MAX_PENDING creates
+# wait in the queue; beyond that submit raises GroupCommitBusy (429). A caller that waits
+# longer than GROUP_COMMIT_TIMEOUT_SECONDS gets GroupCommitTimeout (503); if its workout
+# was still queued it is dropped, otherwise the write may still land.
+from concurrent.futures import Future
+import asyncio
+import queue
+import threading
+import time
+
+from . import catalog, config, crud, metrics
+
+_STOP = object()
+
+
+class GroupCommitBusy(Exception):
+    pass
+
+class GroupCommitTimeout(Exception):
+    pass
+
+
+class _PendingCreate:
+    def __init__(self, user_id: int, workout):
+        self.user_id = user_id
+        self.workout = workout
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+_queue = queue.Queue(maxsize=config.GROUP_COMMIT_MAX_PENDING)
+_thread = None
+_lock = threading.Lock()
+_counters = {"written": 0, "failed": 0, "rejected": 0, "batches": 0}
+_counters_lock = threading.Lock()
+
+
+def enabled():
+    return config.GROUP_COMMIT_WINDOW_MS > 0
+
+def _count(name: str):
+    with _counters_lock:
+        _counters[name] += 1
+
+def _ensure_started():
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="group-commit", daemon=True)
+            _thread.start()
+
+# Returns a concurrent.futures.Future resolving to the serialized workout
+def submit(user_id: int, workout):
+    _ensure_started()
+    pending = _PendingCreate(user_id, workout)
+    try:
+        _queue.put_nowait(pending)
+    except queue.Full:
+        _count("rejected")
+        raise GroupCommitBusy()
+    return pending.future
+
+async def create_workout(user_id: int, workout):
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(submit(user_id, workout)), config.GROUP_COMMIT_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise GroupCommitTimeout()
+
+
+def _run():
+    window = config.GROUP_COMMIT_WINDOW_MS / 1000
+    stopping = False
+    while not stopping:
+        first = _queue.get()
+        if first is _STOP:
+            return
+        batch = [first]
+        deadline = time.perf_counter() + window
+        while len(batch) < config.GROUP_COMMIT_MAX_BATCH:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = _queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if pending is _STOP:
+                stopping = True
+                break
+            batch.append(pending)
+        # Callers that timed out while queued have cancelled their futures; skip them
+        batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+        if batch:
+            _write(batch)
+
+def _finish(pending: _PendingCreate, result=None, error: Exception = None):
+    if error is None:
+        _count("written")
+        pending.future.set_result(result)
+    else:
+        _count("failed")
+        pending.future.set_exception(error)
+    metrics.group_commit_wait.observe(time.perf_counter() - pending.submitted_at)
+
+def _write(batch):
+    _count("batches")
+    metrics.group_commit_batch_size.observe(len(batch))
+    db = config.SessionLocal()
+    try:
+        missing = set(catalog.missing_exercise_ids(db, {we.exercise_id for p in batch for we in p.workout.exercises}))
+        valid = []
+        for pending in batch:
+            unknown = sorted({we.exercise_id for we in pending.workout.exercises} & missing)
+            if unknown:
+                _finish(pending, error=crud.UnknownExerciseError(unknown))
+            else:
+                valid.append(pending)
+        if not valid:
+            return
+        try:
+            results = _write_together(db, valid)
+        except Exception:
+            db.rollback()
+            # Don't let one failing workout take its neighbours down: retry each on its own
+            for pending in valid:
+                try:
+                    _finish(pending, crud.create_workout(db, pending.user_id, pending.workout))
+                except Exception as e:
+                    db.rollback()
+                    _finish(pending, error=e)
+            return
+        for pending, result in results:
+            _finish(pending, result)
+    except Exception as e:
+        for pending in batch:
+            if not pending.future.done():
+                _finish(pending, error=e)
+    finally:
+        db.close()
+
+# One transaction for the whole batch. Users are written in id order so concurrent
+# writers take the rollup row locks in the same order.
+def _write_together(db, batch):
+    by_user = {}
+    for pending in batch:
+        by_user.setdefault(pending.user_id, []).append(pending)
+    results = []
+    for user_id in sorted(by_user):
+        user_batch = by_user[user_id]
+        created = crud.add_workouts(db, user_id, [p.workout for p in user_batch])
+        results += zip(user_batch, created)
+    db.commit()
+    for user_id, user_batch in by_user.items():
+        crud.workouts_written(user_id, {p.workout.date for p in user_batch})
+    return results
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    return {**counters, "pending": _queue.qsize()}
+
+# Writes whatever is queued ahead of the stop marker, then stops the writer. Creates the
+# writer doesn't get to before the timeout fail with GroupCommitBusy.
+def shutdown(timeout: float = 10):
+    global _thread
+    with _lock:
+        thread, _thread = _thread, None
+    if thread is not None and thread.is_alive():
+        deadline = time.perf_counter() + timeout
+        try:
+            _queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout=max(deadline - time.perf_counter(), 0))
+    while True:
+        try:
+            pending = _queue.get_nowait()
+        except queue.Empty:
+            break
+        if pending is not _STOP and pending.future.set_running_or_notify_cancel():
+            _finish(pending, error=GroupCommitBusy())
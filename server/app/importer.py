@@ -0,0 +1,290 @@
+# app/importer.py
+# Streaming bulk import of workout history for POST /workouts/import.
+#
+# The request body is read incrementally and handled IMPORT_CHUNK_ROWS records at a time,
+# so memory stays bounded by the chunk size (plus one id per imported workout).
+# Each chunk is parsed and validated row by row, written with multi-row inserts (COPY on
+# Postgres) and committed together with its rollup deltas, all in one threadpool call so
+# the event loop only reads the body. Invalid rows are skipped and reported.
+#
+# CSV: header row with name, date, exercise_id, duration and an optional workout_ref.
+#   Rows sharing a workout_ref (or, without one, the same name and date) become one workout.
+#   Quoted fields may span lines (up to MAX_CSV_RECORD_LINES); errors report the line the
+#   record starts on.
+# NDJSON: one object per line, either a flat row with the CSV fields or a whole workout
+#   shaped like schema.WorkoutCreate ({"name", "date", "exercises": [...]}, at least one
+#   exercise).
+#
+# A body that can't be read past some point (invalid UTF-8, an unterminated quote, an
+# overlong line) is a 400 if no data rows came before it. Otherwise the rows before it are
+# still written and the report's "stopped" says where the import ended, since earlier
+# chunks are already committed.
+import codecs
+import csv
+import io
+import itertools
+import json
+from datetime import datetime
+from functools import lru_cache
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import models, schema, rollups, catalog, trends, response_cache
+
+IMPORT_CHUNK_ROWS = 5000
+MAX_REPORTED_ERRORS = 1000
+CSV_REQUIRED_COLUMNS = {"name", "date", "exercise_id", "duration"}
+# Bounds on what is held in memory while looking for the end of a line or CSV record
+MAX_LINE_CHARS = 1_000_000
+MAX_CSV_RECORD_LINES = 100
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.workouts_created = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.errors = []
+        self.stopped = None
+
+    def reject(self, line: int, error: str):
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def stop(self, error: str):
+        self.stopped = error
+
+    def as_dict(self):
+        return {
+            "workouts_created": self.workouts_created,
+            "rows_imported": self.rows_imported,
+            "rows_rejected": self.rows_rejected,
+            "errors": self.errors,
+            "errors_truncated": self.rows_rejected > len(self.errors),
+            "stopped": self.stopped,
+        }
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str):
+    try:
+        return datetime.strptime(value.strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Date must be in YYYY-MM-DD format")
+
+def _error_message(exc: Exception):
+    if isinstance(exc, ValidationError):
+        error = exc.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        return f"{field}: {error['msg']}" if field else error["msg"]
+    return str(exc)
+
+# A flat row -> (workout_key, name, date, exercise_id, duration)
+def _parse_flat_row(values: dict):
+    name = values.get("name") or ""
+    if not isinstance(name, str):
+        raise ValueError("name must be a string")
+    name = name.strip()
+    if not name:
+        raise ValueError("name is required")
+    workout_date = values.get("date") or ""
+    if not isinstance(workout_date, str):
+        raise ValueError("Date must be in YYYY-MM-DD format")
+    workout_date = parse_date(workout_date)
+    exercise = schema.WorkoutExerciseCreate(exercise_id=values.get("exercise_id"), duration=values.get("duration"))
+    ref = values.get("workout_ref")
+    key = ("ref", str(ref)) if ref not in (None, "") else ("name", name, workout_date)
+    return key, name, workout_date, exercise.exercise_id, exercise.duration
+
+# records are (line_number, text) pairs holding one whole CSV record each.
+# Yields (line_number, [parsed rows]) or (line_number, exception) for each data record
+def _parse_csv(records, header):
+    position = 0
+    while position < len(records):
+        # A record csv can't read rejects just that record; reading resumes after it
+        reader = csv.reader(text for _, text in itertools.islice(records, position, None))
+        try:
+            for values in reader:
+                line = records[position][0]
+                position += 1
+                if not values:
+                    continue
+                try:
+                    yield line, [_parse_flat_row(dict(zip(header, values)))]
+                except (ValueError, ValidationError) as e:
+                    yield line, e
+        except csv.Error as e:
+            yield records[position][0], ValueError(f"Malformed CSV: {e}")
+            position += 1
+
+def _parse_ndjson(lines):
+    for line, text in lines:
+        if not text.strip():
+            continue
+        try:
+            values = json.loads(text)
+            if not isinstance(values, dict):
+                raise ValueError("expected a JSON object")
+            if "exercises" in values:
+                workout = schema.WorkoutCreate(**values)
+                if not workout.exercises:
+                    raise ValueError("exercises must not be empty")
+                key = ("line", line)
+                yield line, [(key, workout.name, workout.date, we.exercise_id, we.duration) for we in workout.exercises]
+            else:
+                yield line, [_parse_flat_row(values)]
+        except (ValueError, ValidationError) as e:
+            yield line, e
+
+
+def insert_workout_exercises(db: Session, rows):
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(f"{row['workout_id']}\t{row['exercise_id']}\t{row['duration']}\n")
+        buffer.seek(0)
+        dbapi_connection = db.connection().connection.driver_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert("COPY workout_exercises (workout_id, exercise_id, duration) FROM STDIN", buffer)
+    else:
+        # Core insert on the table: executemany without the ORM bulk-insert bookkeeping
+        db.execute(models.WorkoutExercise.__table__.insert(), rows)
+
+# workout_ids maps workout keys to (id, name, date) of workouts created earlier in this import;
+# rows that reuse a key join that workout whatever name they carry
+def _write_chunk(db: Session, user_id: int, parsed, workout_ids: dict, report: ImportReport):
+    exercise_ids = {row[3] for _, rows in parsed if not isinstance(rows, Exception) for row in rows}
+    missing = set(catalog.missing_exercise_ids(db, exercise_ids))
+
+    accepted = []
+    for line, rows in parsed:
+        if isinstance(rows, Exception):
+            report.reject(line, _error_message(rows))
+        elif any(row[3] in missing for row in rows):
+            report.reject(line, f"Unknown exercise_id: {next(row[3] for row in rows if row[3] in missing)}")
+        else:
+            accepted.extend(rows)
+    if not accepted:
+        return
+
+    stats = rollups.ensure_user_rollups(db, user_id)
+    new_keys = {}
+    for key, name, workout_date, _, _ in accepted:
+        if key not in workout_ids and key not in new_keys:
+            new_keys[key] = (name, workout_date)
+    new_workouts = []
+    if new_keys:
+        result = db.execute(
+            models.Workout.__table__.insert().returning(models.Workout.__table__.c.id, sort_by_parameter_order=True),
+            [{"name": name, "date": workout_date, "user_id": user_id} for name, workout_date in new_keys.values()],
+        )
+        for (key, (name, workout_date)), workout_id in zip(new_keys.items(), result.scalars()):
+            workout_ids[key] = (workout_id, name, workout_date)
+            new_workouts.append((workout_id, name, workout_date))
+
+    insert_workout_exercises(db, [
+        {"workout_id": workout_ids[key][0], "exercise_id": exercise_id, "duration": duration}
+        for key, _, _, exercise_id, duration in accepted
+    ])
+    rollups.record_workouts_imported(db, stats, new_workouts, [(workout_ids[key][1], duration) for key, _, _, _, duration in accepted])
+    db.commit()
+    trends.invalidate(user_id, {workout_ids[key][2] for key, _, _, _, _ in accepted})
+    response_cache.invalidate_user(user_id)
+
+    report.workouts_created += len(new_workouts)
+    report.rows_imported += len(accepted)
+
+# Runs in the threadpool: parsing and validation are as CPU-bound as the write
+def _import_chunk(db: Session, user_id: int, fmt: str, header, chunk, workout_ids: dict, report: ImportReport):
+    parsed = list(_parse_csv(chunk, header)) if fmt == "csv" else list(_parse_ndjson(chunk))
+    _write_chunk(db, user_id, parsed, workout_ids, report)
+
+
+# Yields (line_number, line) with the line ending removed; a line split across body
+# chunks is held back until its end arrives
+async def _iter_lines(byte_stream):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending, line_number = "", 0
+    async for chunk in byte_stream:
+        try:
+            pending += decoder.decode(chunk)
+            invalid = None
+        except UnicodeDecodeError as e:
+            # Hand on the lines before the bad bytes, then stop
+            pending += e.object[:e.start].decode("utf-8")
+            invalid = e
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip("\r")
+        if invalid is not None:
+            raise ImportFormatError(f"Line {line_number + 1}: not valid UTF-8 ({invalid.reason})")
+        if len(pending) > MAX_LINE_CHARS:
+            raise ImportFormatError(f"Line {line_number + 1}: longer than {MAX_LINE_CHARS} characters")
+    try:
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f"Line {line_number + 1}: not valid UTF-8 ({e.reason})")
+    if pending:
+        yield line_number + 1, pending.rstrip("\r")
+
+# Joins lines into whole CSV records: while a record has an odd number of quote
+# characters a quoted field is still open, so the newline belongs to the field
+async def _iter_csv_records(lines):
+    record, start, quotes = [], None, 0
+    async for line_number, line in lines:
+        if not record:
+            start = line_number
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield start, "\n".join(record)
+            record, quotes = [], 0
+        elif len(record) >= MAX_CSV_RECORD_LINES:
+            raise ImportFormatError(f"Line {start}: quoted field still open after {MAX_CSV_RECORD_LINES} lines")
+    if record:
+        raise ImportFormatError(f"Line {start}: quoted field is never closed")
+
+async def import_stream(db: Session, user_id: int, byte_stream, fmt: str):
+    report = ImportReport()
+    workout_ids = {}
+    header = None
+    chunk = []
+    records = _iter_lines(byte_stream)
+    if fmt == "csv":
+        records = _iter_csv_records(records)
+
+    read_any = False
+    try:
+        async for line_number, text in records:
+            if fmt == "csv" and header is None:
+                try:
+                    header = [column.strip().lower() for column in next(csv.reader([text]), [])]
+                except csv.Error as e:
+                    raise ImportFormatError(f"Malformed CSV header: {e}")
+                missing = CSV_REQUIRED_COLUMNS - set(header)
+                if missing:
+                    raise ImportFormatError(f"CSV header is missing column(s): {', '.join(sorted(missing))}")
+                continue
+            read_any = True
+            chunk.append((line_number, text))
+            if len(chunk) >= IMPORT_CHUNK_ROWS:
+                await run_in_threadpool(_import_chunk, db, user_id, fmt, header, chunk, workout_ids, report)
+                chunk = []
+    except ImportFormatError as e:
+        if not read_any:
+            raise
+        report.stop(str(e))
+    if chunk:
+        await run_in_threadpool(_import_chunk, db, user_id, fmt, header, chunk, workout_ids, report)
+    return report.as_dict()
@@ -1,12 +1,33 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
+from fastapi.responses import JSONResponse
+from . import passwords, config, metrics, group_commit
 from .config import engine
 from app.routes import router
 
-models.Base.metadata.create_all(bind=engine)
+# The schema is managed by migrations.py; run `python -m app.migrations upgrade` before starting
+metrics.instrument_engine(engine, "sync")
+if config.async_engine is not None:
+    metrics.instrument_engine(config.async_engine.sync_engine, "async")
 
 app = FastAPI()
+app.add_event_handler("shutdown", passwords.shutdown)
+app.add_event_handler("shutdown", group_commit.shutdown)
+
+# The password hashing queue is full; tell the client to back off rather than queueing forever
+@app.exception_handler(passwords.PasswordHasherBusy)
+def password_hasher_busy(request, exc):
+    return JSONResponse(status_code=429, content={"detail": "Too many login attempts, try again shortly"}, headers={"Retry-After": "1"})
+
+# The group-commit queue is full
+@app.exception_handler(group_commit.GroupCommitBusy)
+def group_commit_busy(request, exc):
+    return JSONResponse(status_code=429, content={"detail": "Too many workouts being saved, try again shortly"}, headers={"Retry-After": "1"})
+
+# The writer didn't get to the workout in time; it may or may not have been saved
+@app.exception_handler(group_commit.GroupCommitTimeout)
+def group_commit_timeout(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Timed out saving the workout"}, headers={"Retry-After": "1"})
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +38,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
+if config.DB_MODE == "async":
+    # Registered first so its handlers win for the paths both routers define
+    from app.async_routes import router as async_router
+    app.include_router(async_router)
 app.include_router(router)
\ No newline at end of file
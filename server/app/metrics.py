@@ -0,0 +1,184 @@
+# app/metrics.py
+# Request and SQL instrumentation, exported as Prometheus text on /metrics.
+#
+# MetricsMiddleware times every request by route template. SQLAlchemy cursor events
+# count and time the queries each request issues (tracked through a contextvar, which
+# follows the request into the threadpool and into AsyncSession.run_sync). Pool gauges
+# are read from the engines at scrape time. With SLOW_REQUEST_MS set, slower requests
+# are logged together with the SQL they ran.
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+
+from . import config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+MAX_LOGGED_STATEMENTS = 50
+
+slow_log = logging.getLogger("app.slow_requests")
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+                prefix = labels + "," if labels else ""
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{self.name}_sum{suffix} {total}")
+                lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _metric(name: str, help_text: str, samples, kind: str = "gauge"):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+
+request_latency = Histogram(
+    "fitflex_http_request_duration_seconds", "Request latency by route", ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "fitflex_http_request_queries", "SQL statements issued per request", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+request_db_time = Histogram(
+    "fitflex_http_request_db_seconds", "Time spent in SQL per request", ("method", "route"), LATENCY_BUCKETS
+)
+query_latency = Histogram(
+    "fitflex_db_query_duration_seconds", "Latency of individual SQL statements", (), LATENCY_BUCKETS
+)
+# Fed by group_commit.py
+group_commit_wait = Histogram(
+    "fitflex_group_commit_wait_seconds", "Time from queueing a workout create to its commit", (), LATENCY_BUCKETS
+)
+group_commit_batch_size = Histogram(
+    "fitflex_group_commit_batch_size", "Workout creates written per group commit", (), BATCH_SIZE_BUCKETS
+)
+
+
+class RequestStats:
+    def __init__(self, capture_statements: bool):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if capture_statements else None
+
+_current = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    query_latency.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < MAX_LOGGED_STATEMENTS:
+            stats.statements.append((elapsed, statement))
+
+_engines = []
+
+def instrument_engine(engine, name: str):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _engines.append((name, engine))
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(capture_statements=config.SLOW_REQUEST_MS > 0)
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            request_latency.observe(elapsed, method, route, status)
+            request_queries.observe(stats.queries, method, route)
+            request_db_time.observe(stats.db_seconds, method, route)
+            if config.SLOW_REQUEST_MS > 0 and elapsed * 1000 >= config.SLOW_REQUEST_MS:
+                _log_slow_request(method, scope["path"], status, elapsed, stats)
+
+def _log_slow_request(method, path, status, elapsed, stats):
+    lines = [f"{method} {path} -> {status} took {elapsed * 1000:.1f} ms, {stats.queries} queries ({stats.db_seconds * 1000:.1f} ms in SQL)"]
+    for seconds, statement in stats.statements:
+        lines.append(f"  [{seconds * 1000:.1f} ms] {' '.join(statement.split())}")
+    if stats.queries > len(stats.statements):
+        lines.append(f"  ... {stats.queries - len(stats.statements)} more")
+    slow_log.warning("\n".join(lines))
+
+
+# Pools without sizing (e.g. SQLite's SingletonThreadPool) simply report nothing
+def _pool_samples(attribute: str):
+    samples = []
+    for name, engine in _engines:
+        read = getattr(engine.pool, attribute, None)
+        if callable(read):
+            samples.append(({"engine": name}, read()))
+    return samples
+
+# extra: [(name, kind, help, [(labels, value)])] contributed by other modules
+def render(extra=()):
+    lines = []
+    for histogram in (request_latency, request_queries, request_db_time, query_latency, group_commit_wait, group_commit_batch_size):
+        lines += histogram.render()
+    lines += _metric("fitflex_db_pool_checked_out", "Connections currently checked out", _pool_samples("checkedout"))
+    # QueuePool.overflow() counts up from -pool_size; only connections beyond pool_size are overflow
+    overflow = [(labels, max(value, 0)) for labels, value in _pool_samples("overflow")]
+    lines += _metric("fitflex_db_pool_overflow", "Connections open beyond pool_size", overflow)
+    lines += _metric("fitflex_db_pool_size", "Configured pool size", _pool_samples("size"))
+    for name, kind, help_text, samples in extra:
+        lines += _metric(name, help_text, samples, kind)
+    return "\n".join(lines) + "\n"
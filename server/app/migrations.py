@@ -0,0 +1,149 @@
+# app/migrations.py
+# Schema migrations, run as a separate step before starting the app:
+#
+#   cd server && python -m app.migrations upgrade
+#   cd server && python -m app.migrations status
+#
+# Each migration runs once, in order, in its own transaction and is recorded in
+# schema_migrations. Databases created by the old create_all-at-import are picked up by
+# the first migration, which only creates missing tables. Tables are created from the
+# current models, so later migrations must tolerate objects that already exist.
+import argparse
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, bindparam, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import models
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_tables(conn: Connection, *model_classes):
+    for model in model_classes:
+        model.__table__.create(conn, checkfirst=True)
+
+def _create_indexes(conn: Connection, *indexes: Index):
+    for index in indexes:
+        index.create(conn, checkfirst=True)
+
+def _index(table, name: str):
+    return next(index for index in table.indexes if index.name == name)
+
+def _has_column(conn: Connection, table: str, column: str):
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def initial_tables(conn: Connection):
+    _create_tables(
+        conn, models.User, models.Exercise, models.Workout, models.WorkoutExercise,
+        models.UserStats, models.UserWorkoutTypeStats, models.CatalogVersion,
+    )
+
+def workout_history_indexes(conn: Connection):
+    workouts = models.Workout.__table__
+    workout_exercises = models.WorkoutExercise.__table__
+    _create_indexes(
+        conn,
+        _index(workouts, "ix_workouts_user_id_date"),
+        _index(workout_exercises, "ix_workout_exercises_workout_id"),
+        _index(workout_exercises, "ix_workout_exercises_exercise_id"),
+    )
+    # Give the planner row counts for the new indexes straight away
+    conn.execute(text("ANALYZE"))
+
+
+# Backfills exercises.name_key and makes it unique. Exercises whose names only differ in
+# case or punctuation (the old seed script and /seed-exercises disagreed on "Push Ups")
+# are folded into the oldest one, with workout entries pointed at it.
+def exercise_name_keys(conn: Connection):
+    exercises = models.Exercise.__table__
+    if not _has_column(conn, "exercises", "name_key"):
+        conn.execute(text("ALTER TABLE exercises ADD COLUMN name_key VARCHAR"))
+    keepers, duplicates, keys = {}, {}, []
+    for exercise_id, name in conn.execute(select(exercises.c.id, exercises.c.name).order_by(exercises.c.id)):
+        key = models.exercise_name_key(name)
+        if key in keepers:
+            duplicates[exercise_id] = keepers[key]
+        else:
+            keepers[key] = exercise_id
+            keys.append({"_id": exercise_id, "_key": key})
+    if duplicates:
+        workout_exercises = models.WorkoutExercise.__table__
+        conn.execute(
+            workout_exercises.update().where(workout_exercises.c.exercise_id == bindparam("_old")).values(exercise_id=bindparam("_new")),
+            [{"_old": old, "_new": new} for old, new in duplicates.items()],
+        )
+        conn.execute(exercises.delete().where(exercises.c.id.in_(list(duplicates))))
+        versions = models.CatalogVersion.__table__
+        if not conn.execute(versions.update().where(versions.c.id == 1).values(version=versions.c.version + 1)).rowcount:
+            conn.execute(versions.insert().values(id=1, version=1))
+    if keys:
+        conn.execute(exercises.update().where(exercises.c.id == bindparam("_id")).values(name_key=bindparam("_key")), keys)
+    _create_indexes(conn, _index(exercises, "uq_exercises_name_key"))
+
+def workout_archive_tables(conn: Connection):
+    _create_tables(conn, models.WorkoutMonthSummary, models.WorkoutArchive)
+
+# exercise_name_key now keeps non-Latin letters and folds accents, so keys written by
+# migration 3 are recomputed and exercises that now share a key are merged. The unique
+# index is rebuilt afterwards: a key can move onto one another row still holds until its
+# own update runs ("Caf" takes "caf" from "Café", which becomes "cafe").
+def unicode_exercise_name_keys(conn: Connection):
+    _index(models.Exercise.__table__, "uq_exercises_name_key").drop(conn, checkfirst=True)
+    exercise_name_keys(conn)
+
+
+# (version, name, function); append only, never renumber
+MIGRATIONS = [
+    (1, "initial tables", initial_tables),
+    (2, "workout history indexes", workout_history_indexes),
+    (3, "exercise name keys", exercise_name_keys),
+    (4, "workout archive tables", workout_archive_tables),
+    (5, "unicode exercise name keys", unicode_exercise_name_keys),
+]
+
+
+def applied_versions(engine: Engine):
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return {row.version for row in conn.execute(select(schema_migrations.c.version))}
+
+def pending_migrations(engine: Engine):
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+def upgrade(engine: Engine, target=None):
+    applied = []
+    for version, name, migrate in pending_migrations(engine):
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        applied.append((version, name))
+    return applied
+
+
+if __name__ == "__main__":
+    from app.config import engine
+
+    parser = argparse.ArgumentParser(description="Apply or list database schema migrations")
+    parser.add_argument("command", choices=["upgrade", "status"])
+    parser.add_argument("--target", type=int, help="stop after this version (upgrade only)")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = upgrade(engine, target=args.target)
+        for version, name in applied:
+            print(f"applied {version:04d} {name}")
+        print(f"{len(applied)} migration(s) applied.")
+    else:
+        done = applied_versions(engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:04d} {name}: {'applied' if version in done else 'pending'}")
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+import re
+import unicodedata
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Index, LargeBinary
 from sqlalchemy.orm import relationship
 
 from .config import Base
@@ -18,6 +21,9 @@ class User(Base):
 
 class Workout(Base):
     __tablename__ = "workouts"
+    # Per-user history in (date, id) order; also serves plain user_id lookups.
+    # Indexes are created by migrations.py, keep the two in step.
+    __table_args__ = (Index("ix_workouts_user_id_date", "user_id", "date", "id"),)
     id = Column(Integer, primary_key=True)
     name = Column(String)
     date = Column(Date)
@@ -27,12 +33,28 @@ class Workout(Base):
     workout_exercises = relationship("WorkoutExercise", back_populates="workout")
 
 
+# "Push-ups", "push ups" and "PUSHUPS" are the same exercise, and so are "Café" and "cafe"
+# (same rule as exercise_search.normalize). Letters and digits of any script are kept;
+# NFKD splits accents off as combining marks, which are dropped with the punctuation.
+_name_key_separators = re.compile(r"[\W_]+")
+
+def exercise_name_key(name: str):
+    return _name_key_separators.sub("", unicodedata.normalize("NFKD", name or "").casefold())
+
+def _name_key_default(context):
+    return exercise_name_key(context.get_current_parameters()["name"])
+
+
 class Exercise(Base):
     __tablename__ = "exercises"
+    # The catalog loader upserts on this; created by migrations.py
+    __table_args__ = (Index("uq_exercises_name_key", "name_key", unique=True),)
     id = Column(Integer, primary_key=True)
     name = Column(String)
     category = Column(String)
     description = Column(String)
+    # Derived from name on insert; code that renames an exercise must set it as well
+    name_key = Column(String, nullable=False, default=_name_key_default)
 
     workout_exercises = relationship("WorkoutExercise", back_populates="exercise")
 
@@ -40,9 +62,61 @@ class Exercise(Base):
 class WorkoutExercise(Base):
     __tablename__ = "workout_exercises"
     id = Column(Integer, primary_key=True)
-    workout_id = Column(Integer, ForeignKey("workouts.id"))
-    exercise_id = Column(Integer, ForeignKey("exercises.id"))
+    workout_id = Column(Integer, ForeignKey("workouts.id"), index=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), index=True)
     duration = Column(Integer)
 
     workout = relationship("Workout", back_populates="workout_exercises")
-    exercise = relationship("Exercise", back_populates="workout_exercises")
\ No newline at end of file
+    exercise = relationship("Exercise", back_populates="workout_exercises")
+
+# Per-user dashboard totals, kept in step with workouts by crud (see rollups.py)
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_workouts = Column(Integer, nullable=False, default=0)
+    total_exercises = Column(Integer, nullable=False, default=0)
+    total_minutes = Column(Integer, nullable=False, default=0)
+    latest_workout_id = Column(Integer)
+    latest_workout_name = Column(String)
+    latest_workout_date = Column(Date)
+
+
+class UserWorkoutTypeStats(Base):
+    __tablename__ = "user_workout_type_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    workout_name = Column(String, primary_key=True)
+    exercise_count = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+
+
+# Archived history (see archive.py). Workouts older than the archive horizon leave the
+# workouts tables; each user's month keeps totals per workout name for the dashboard and
+# month trends, plus the raw rows, compressed, for day/week trends and exports.
+class WorkoutMonthSummary(Base):
+    __tablename__ = "workout_month_summaries"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    workout_name = Column(String, primary_key=True)
+    workouts = Column(Integer, nullable=False, default=0)
+    exercises = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+    # Newest archived workout with this name in the month, for the dashboard's latest workout
+    latest_workout_id = Column(Integer)
+    latest_workout_date = Column(Date)
+
+
+class WorkoutArchive(Base):
+    __tablename__ = "workout_archives"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    workout_count = Column(Integer, nullable=False, default=0)
+    row_count = Column(Integer, nullable=False, default=0)
+    # zlib-compressed JSON: [[workout_id, name, "YYYY-MM-DD", [[exercise_id, duration], ...]], ...]
+    payload = Column(LargeBinary, nullable=False)
+
+
+# Single row (id=1) bumped whenever the exercise catalog changes; see catalog.py
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,77 @@
+# app/passwords.py
+# bcrypt hashing and verification run in a bounded process pool so a login burst
+# can't tie up the request threadpool. Requests beyond PASSWORD_HASH_MAX_PENDING are
+# rejected with PasswordHasherBusy (429) instead of queueing.
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from . import config
+
+# min/max rounds equal to the default make verify_and_update flag hashes made at any other cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=config.BCRYPT_ROUNDS,
+)
+
+_pool = None
+_pending = 0
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password: str):
+    return pwd_context.hash(password)
+
+# Returns (matches, new_hash); new_hash is set when the stored hash uses an outdated cost
+def _verify_and_update(password: str, password_hash: str):
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: forked workers inherit uvicorn's signal handlers, ignore
+        # SIGTERM and outlive the server
+        _pool = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+async def _submit(fn, *args):
+    global _pending
+    if _pending >= config.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHasherBusy()
+    _pending += 1
+    try:
+        if config.PASSWORD_HASH_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str):
+    return await _submit(_hash, password)
+
+async def verify_password(password: str, password_hash: str):
+    return await _submit(_verify_and_update, password, password_hash)
+
+def stats():
+    return {
+        "workers": config.PASSWORD_HASH_WORKERS,
+        "max_pending": config.PASSWORD_HASH_MAX_PENDING,
+        "pending": _pending,
+    }
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
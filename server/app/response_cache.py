@@ -0,0 +1,127 @@
+# app/response_cache.py
+# Per-user cache of encoded JSON responses for the read endpoints the dashboard and
+# history pages re-fetch on every navigation (/dashboard/stats, /dashboard/time-by-type,
+# /workouts).
+#
+# Each user has a version that crud bumps (invalidate_user) after every committed write
+# to their workouts. Entries are keyed by (user, version, path and query string), so a
+# bump orphans them all at once, and the version doubles as the ETag: a request whose
+# If-None-Match still names it gets a 304 without touching the database.
+#
+# Storage goes through a backend. MemoryBackend is process-local, so with several workers
+# an entry can outlive a write made by another worker for up to RESPONSE_CACHE_TTL_SECONDS.
+# A shared backend (e.g. Redis INCR for versions, SET with EX for entries) implements the
+# same four methods and is installed with set_backend() at startup.
+import itertools
+import secrets
+
+import orjson
+from fastapi import Request, Response
+
+from . import config
+from .cache import TTLCache
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self.versions = TTLCache(maxsize, ttl)
+        # Versions come from one process-wide counter, so a user whose version was evicted
+        # gets a new one rather than a number their old entries are still stored under.
+        # The random epoch keeps ETags from a previous process from matching.
+        self._counter = itertools.count(1)
+        self._epoch = secrets.token_hex(4)
+
+    def _next_version(self):
+        return f"{self._epoch}-{next(self._counter)}"
+
+    def get_version(self, user_id: int):
+        version = self.versions.peek(user_id)
+        if version is None:
+            version = self._next_version()
+            self.versions.set(user_id, version)
+        return version
+
+    def bump_version(self, user_id: int):
+        self.versions.set(user_id, self._next_version())
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries.set(key, value)
+
+    def clear(self):
+        self.entries.clear()
+        self.versions.clear()
+
+    def stats(self):
+        return self.entries.stats()
+
+
+_backend = MemoryBackend(config.RESPONSE_CACHE_SIZE, config.RESPONSE_CACHE_TTL_SECONDS)
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+def invalidate_user(user_id: int):
+    _backend.bump_version(user_id)
+
+def clear():
+    _backend.clear()
+
+def stats():
+    return _backend.stats()
+
+
+def _etag(version: str):
+    return f'W/"{version}"'
+
+def _not_modified(request: Request, etag: str):
+    if_none_match = request.headers.get("if-none-match", "")
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+# (version, cache key, 304 or cached response or None)
+def _lookup(request: Request, user_id: int):
+    version = _backend.get_version(user_id)
+    etag = _etag(version)
+    if _not_modified(request, etag):
+        return version, None, Response(status_code=304, headers=_headers(etag))
+    key = (user_id, version, request.url.path, str(request.query_params))
+    cached = _backend.get(key)
+    return version, key, _response(cached, etag) if cached is not None else None
+
+# The entry is stored under the version read before the data was, so a write that
+# commits in between leaves it under a version nobody asks for any more
+def _store(key, version: str, content, headers):
+    entry = (orjson.dumps(content), headers or {})
+    _backend.set(key, entry)
+    return _response(entry, _etag(version))
+
+def _headers(etag: str, extra=None):
+    return {**(extra or {}), "ETag": etag, "Cache-Control": "private, no-cache"}
+
+def _response(entry, etag: str):
+    body, headers = entry
+    return Response(content=body, media_type="application/json", headers=_headers(etag, headers))
+
+
+# build() returns the JSON-able content, or (content, extra headers)
+def respond(request: Request, user_id: int, build):
+    version, key, response = _lookup(request, user_id)
+    if response is not None:
+        return response
+    content, headers = _split(build())
+    return _store(key, version, content, headers)
+
+async def respond_async(request: Request, user_id: int, build):
+    version, key, response = _lookup(request, user_id)
+    if response is not None:
+        return response
+    content, headers = _split(await build())
+    return _store(key, version, content, headers)
+
+def _split(result):
+    return result if isinstance(result, tuple) else (result, None)
@@ -0,0 +1,282 @@
+# app/rollups.py
+# Per-user dashboard rollups. crud applies deltas in the same transaction as each
+# workout write; rebuild/verify recompute them from the raw workout rows plus the
+# summaries of archived months (see archive.py).
+import argparse
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models, archive
+
+
+# Raw aggregates, computed the same way the dashboard used to compute them
+def compute_user_stats(db: Session, user_id: int):
+    total_workouts = db.query(func.count(models.Workout.id)).filter(models.Workout.user_id == user_id).scalar()
+    total_exercises, total_minutes = (
+        db.query(func.count(models.WorkoutExercise.id), func.coalesce(func.sum(models.WorkoutExercise.duration), 0))
+        .join(models.Workout, models.Workout.id == models.WorkoutExercise.workout_id)
+        .filter(models.Workout.user_id == user_id)
+        .one()
+    )
+    latest = latest_workout_entry(db, user_id)
+    by_name = (
+        db.query(models.Workout.name, func.count(models.WorkoutExercise.id), func.sum(models.WorkoutExercise.duration))
+        .join(models.WorkoutExercise, models.Workout.id == models.WorkoutExercise.workout_id)
+        .filter(models.Workout.user_id == user_id)
+        .group_by(models.Workout.name)
+        .all()
+    )
+    by_name = {name: (count, minutes) for name, count, minutes in by_name}
+    archived_workouts, archived_exercises, archived_minutes, archived_by_name = archive.archived_totals(db, user_id)
+    for name, (count, minutes) in archived_by_name.items():
+        hot_count, hot_minutes = by_name.get(name, (0, 0))
+        by_name[name] = (hot_count + count, hot_minutes + minutes)
+    return {
+        "total_workouts": total_workouts + archived_workouts,
+        "total_exercises": total_exercises + archived_exercises,
+        "total_minutes": total_minutes + archived_minutes,
+        "latest_workout_id": latest[0] if latest else None,
+        "latest_workout_name": latest[1] if latest else None,
+        "latest_workout_date": latest[2] if latest else None,
+        "by_name": by_name,
+    }
+
+def latest_workout(db: Session, user_id: int):
+    return (
+        db.query(models.Workout)
+        .filter(models.Workout.user_id == user_id)
+        .order_by(models.Workout.date.desc(), models.Workout.id.desc())
+        .first()
+    )
+
+# (id, name, date) of the user's newest workout, hot or archived
+def latest_workout_entry(db: Session, user_id: int):
+    hot = latest_workout(db, user_id)
+    candidates = [entry for entry in (
+        (hot.id, hot.name, hot.date) if hot else None,
+        archive.latest_archived(db, user_id),
+    ) if entry]
+    return max(candidates, key=lambda entry: (entry[2], entry[0]), default=None)
+
+def stored_user_stats(db: Session, user_id: int):
+    stats = db.get(models.UserStats, user_id)
+    if stats is None:
+        return None
+    rows = db.query(models.UserWorkoutTypeStats).filter(
+        models.UserWorkoutTypeStats.user_id == user_id,
+        models.UserWorkoutTypeStats.exercise_count > 0
+    ).all()
+    return {
+        "total_workouts": stats.total_workouts,
+        "total_exercises": stats.total_exercises,
+        "total_minutes": stats.total_minutes,
+        "latest_workout_id": stats.latest_workout_id,
+        "latest_workout_name": stats.latest_workout_name,
+        "latest_workout_date": stats.latest_workout_date,
+        "by_name": {r.workout_name: (r.exercise_count, r.minutes) for r in rows},
+    }
+
+# INSERT ... ON CONFLICT for the rollup tables. Rows are created with upserts rather than
+# read-then-add, because concurrent first requests for a user (the dashboard loads stats
+# and time-by-type at once) would otherwise both insert the same key.
+def _insert(db: Session, table):
+    dialect = db.get_bind().dialect.name
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if insert is None:
+        raise NotImplementedError(f"Rollup upserts are not implemented for {dialect}")
+    return insert(table)
+
+# Overwrite a user's rollups with freshly computed values (does not commit)
+def rebuild_user_rollups(db: Session, user_id: int):
+    fresh = compute_user_stats(db, user_id)
+    totals = {key: value for key, value in fresh.items() if key != "by_name"}
+    statement = _insert(db, models.UserStats.__table__).values(user_id=user_id, **totals)
+    db.execute(statement.on_conflict_do_update(index_elements=["user_id"], set_=totals))
+
+    types = models.UserWorkoutTypeStats.__table__
+    db.execute(types.delete().where(types.c.user_id == user_id, types.c.workout_name.notin_(list(fresh["by_name"]))))
+    if fresh["by_name"]:
+        statement = _insert(db, types)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["user_id", "workout_name"],
+                set_={"exercise_count": statement.excluded.exercise_count, "minutes": statement.excluded.minutes},
+            ),
+            [
+                {"user_id": user_id, "workout_name": name, "exercise_count": count, "minutes": minutes}
+                for name, (count, minutes) in fresh["by_name"].items()
+            ],
+        )
+    return db.get(models.UserStats, user_id, populate_existing=True)
+
+# First rollups for a user, from the raw rows (does not commit). If a concurrent request
+# created the row first, its row and the deltas already applied to it are kept; the
+# per-name counts are added with the same increments writers use.
+def create_user_rollups(db: Session, user_id: int):
+    fresh = compute_user_stats(db, user_id)
+    totals = {key: value for key, value in fresh.items() if key != "by_name"}
+    statement = _insert(db, models.UserStats.__table__).values(user_id=user_id, **totals)
+    if db.execute(statement.on_conflict_do_nothing(index_elements=["user_id"])).rowcount:
+        _apply_exercise_deltas(db, user_id, fresh["by_name"])
+    return db.get(models.UserStats, user_id, populate_existing=True)
+
+# Get the rollup row, backfilling it from raw rows for users who predate the rollups.
+# Writers must call this before touching the workout tables so the backfill and the delta don't overlap.
+def ensure_user_rollups(db: Session, user_id: int):
+    stats = db.get(models.UserStats, user_id)
+    if stats is None:
+        stats = create_user_rollups(db, user_id)
+    return stats
+
+# Dashboard read path: one primary-key lookup, backfilling (and committing) on first use
+def get_user_rollups(db: Session, user_id: int):
+    stats = db.get(models.UserStats, user_id)
+    if stats is None:
+        create_user_rollups(db, user_id)
+        db.commit()
+        stats = db.get(models.UserStats, user_id)
+    return stats
+
+# deltas: {workout_name: (exercise_count, minutes)}
+def _apply_exercise_deltas(db: Session, user_id: int, deltas: dict):
+    rows = [
+        {"user_id": user_id, "workout_name": name, "exercise_count": count, "minutes": minutes}
+        for name, (count, minutes) in sorted(deltas.items())
+        if count or minutes
+    ]
+    if not rows:
+        return
+    # One upsert, run as an executemany over every name, that increments in SQL: concurrent
+    # writers neither lose updates nor collide creating the row for a new workout name.
+    # Names are sorted so writers take the row locks in the same order.
+    types = models.UserWorkoutTypeStats.__table__
+    statement = _insert(db, types)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["user_id", "workout_name"],
+        set_={
+            "exercise_count": types.c.exercise_count + statement.excluded.exercise_count,
+            "minutes": types.c.minutes + statement.excluded.minutes,
+        },
+    ), rows)
+
+def _apply_totals(db: Session, user_id: int, workouts: int, exercises: int, minutes: int):
+    if not workouts and not exercises and not minutes:
+        return
+    db.query(models.UserStats).filter(models.UserStats.user_id == user_id).update({
+        models.UserStats.total_workouts: models.UserStats.total_workouts + workouts,
+        models.UserStats.total_exercises: models.UserStats.total_exercises + exercises,
+        models.UserStats.total_minutes: models.UserStats.total_minutes + minutes,
+    }, synchronize_session=False)
+
+def _refresh_latest(db: Session, stats: models.UserStats):
+    latest = latest_workout_entry(db, stats.user_id)
+    stats.latest_workout_id, stats.latest_workout_name, stats.latest_workout_date = latest or (None, None, None)
+
+def _is_newer(workout_date, workout_id, stats: models.UserStats):
+    if stats.latest_workout_id is None:
+        return True
+    return (workout_date, workout_id) >= (stats.latest_workout_date, stats.latest_workout_id)
+
+# Points latest_* at the workout unless the stored latest is newer. The comparison runs in
+# the UPDATE itself, so concurrent writers can't replace a newer latest with an older one.
+def _offer_latest(db: Session, stats: models.UserStats, workout_id: int, name: str, workout_date):
+    db.query(models.UserStats).filter(
+        models.UserStats.user_id == stats.user_id,
+        or_(
+            models.UserStats.latest_workout_id.is_(None),
+            models.UserStats.latest_workout_date < workout_date,
+            and_(models.UserStats.latest_workout_date == workout_date, models.UserStats.latest_workout_id <= workout_id),
+        ),
+    ).update({
+        models.UserStats.latest_workout_id: workout_id,
+        models.UserStats.latest_workout_name: name,
+        models.UserStats.latest_workout_date: workout_date,
+    }, synchronize_session=False)
+    db.expire(stats)
+
+def record_workout_created(db: Session, stats: models.UserStats, workout: models.Workout, durations):
+    _apply_totals(db, workout.user_id, 1, len(durations), sum(durations))
+    _apply_exercise_deltas(db, workout.user_id, {workout.name: (len(durations), sum(durations))})
+    _offer_latest(db, stats, workout.id, workout.name, workout.date)
+
+# old_name/old_durations describe the workout before the update was applied
+def record_workout_updated(db: Session, stats: models.UserStats, workout: models.Workout, old_name: str, old_durations, durations):
+    count_delta = len(durations) - len(old_durations)
+    minutes_delta = sum(durations) - sum(old_durations)
+    _apply_totals(db, workout.user_id, 0, count_delta, minutes_delta)
+    if old_name == workout.name:
+        _apply_exercise_deltas(db, workout.user_id, {workout.name: (count_delta, minutes_delta)})
+    else:
+        _apply_exercise_deltas(db, workout.user_id, {
+            old_name: (-len(old_durations), -sum(old_durations)),
+            workout.name: (len(durations), sum(durations)),
+        })
+
+    if _is_newer(workout.date, workout.id, stats):
+        _offer_latest(db, stats, workout.id, workout.name, workout.date)
+    elif stats.latest_workout_id == workout.id:
+        db.flush()
+        _refresh_latest(db, stats)
+
+def record_workout_deleted(db: Session, stats: models.UserStats, workout: models.Workout, durations):
+    _apply_totals(db, workout.user_id, -1, -len(durations), -sum(durations))
+    _apply_exercise_deltas(db, workout.user_id, {workout.name: (-len(durations), -sum(durations))})
+    if stats.latest_workout_id == workout.id:
+        db.flush()
+        _refresh_latest(db, stats)
+
+# Bulk variant for imports. new_workouts: [(id, name, date)] created in this batch;
+# exercises: [(workout_name, duration)] for every exercise row added, to new or existing workouts.
+def record_workouts_imported(db: Session, stats: models.UserStats, new_workouts, exercises):
+    by_name = {}
+    for name, duration in exercises:
+        count, minutes = by_name.get(name, (0, 0))
+        by_name[name] = (count + 1, minutes + duration)
+    _apply_totals(db, stats.user_id, len(new_workouts), len(exercises), sum(d for _, d in exercises))
+    _apply_exercise_deltas(db, stats.user_id, by_name)
+
+    if new_workouts:
+        workout_id, name, workout_date = max(new_workouts, key=lambda w: (w[2], w[0]))
+        _offer_latest(db, stats, workout_id, name, workout_date)
+
+# Compare stored rollups against raw rows; returns {user_id: {field: (stored, actual)}}
+def verify_rollups(db: Session, user_ids=None, fix: bool = False):
+    if user_ids is None:
+        user_ids = [uid for (uid,) in db.query(models.User.id).order_by(models.User.id)]
+    drift = {}
+    for user_id in user_ids:
+        fresh = compute_user_stats(db, user_id)
+        stored = stored_user_stats(db, user_id)
+        if stored is None:
+            diffs = {"missing": (None, "rollup row")}
+        else:
+            diffs = {key: (stored[key], fresh[key]) for key in fresh if stored[key] != fresh[key]}
+        if diffs:
+            drift[user_id] = diffs
+            if fix:
+                rebuild_user_rollups(db, user_id)
+    if fix:
+        db.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    from app.config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Verify or rebuild per-user dashboard rollups")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user-id", type=int, action="append", help="limit to these users (repeatable)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drift = verify_rollups(db, user_ids=args.user_id, fix=args.command == "rebuild")
+        for user_id, diffs in drift.items():
+            for field, (stored, actual) in diffs.items():
+                print(f"user {user_id}: {field} stored={stored!r} actual={actual!r}")
+        action = "rebuilt" if args.command == "rebuild" else "drifted"
+        print(f"{len(drift)} user(s) {action}.")
+    finally:
+        db.close()
@@ -1,64 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from datetime import timedelta, datetime
+from datetime import date
+from typing import List, Optional
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError
+from starlette.concurrency import run_in_threadpool
 
-from . import schema, crud, config, models
+from . import schema, crud, models, passwords, auth_cache, catalog, importer, exporter, metrics, trends, exercise_search, catalog_loader, response_cache, group_commit, config
 from .schema import ResetPasswordRequest, ResetPasswordData
 from .config import get_db
-from .models import User, Workout, WorkoutExercise
-from sqlalchemy import func
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+def credentials_exception():
+    return HTTPException(
+        status_code=401,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 # Home route
 @router.get("/")
 def home():
     return {"message": " Welcome to the FitFlex API "}
 
-# Get current login user
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def token_claims(token: str):
     try:
-        payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        claims = auth_cache.decode_token(token)
     except JWTError:
-        raise credentials_exception
+        raise credentials_exception()
+    if claims.get("sub") is None:
+        raise credentials_exception()
+    return claims
 
-    user = crud.get_user_by_username(db, username=username)
+# Get current login user (served from the principal cache when possible)
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> auth_cache.Principal:
+    username = token_claims(token)["sub"]
+    user = auth_cache.get_principal(username, lambda: crud.get_user_by_username(db, username=username))
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
 
+# Get current user id; tokens that carry it need no lookup at all
+def get_current_user_id(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> int:
+    claims = token_claims(token)
+    if "uid" in claims:
+        return claims["uid"]
+    return get_current_user(token, db).id
+
+# Operational endpoints are only served with METRICS_ENABLED=true
+def require_metrics_enabled():
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@router.get("/auth/cache-stats", dependencies=[Depends(require_metrics_enabled)])
+def auth_cache_stats():
+    return auth_cache.stats()
+
+# Prometheus scrape endpoint
+@router.get("/metrics", dependencies=[Depends(require_metrics_enabled)])
+def get_metrics():
+    cache_stats = auth_cache.stats()
+    response_stats = response_cache.stats()
+    commit_stats = group_commit.stats()
+    extra = [
+        ("fitflex_auth_cache_hits_total", "counter", "Auth cache hits",
+         [({"cache": name}, stats["hits"]) for name, stats in cache_stats.items()]),
+        ("fitflex_auth_cache_misses_total", "counter", "Auth cache misses",
+         [({"cache": name}, stats["misses"]) for name, stats in cache_stats.items()]),
+        ("fitflex_trends_cache_hits_total", "counter", "Trend cache hits", [({}, trends.stats()["hits"])]),
+        ("fitflex_trends_cache_misses_total", "counter", "Trend cache misses", [({}, trends.stats()["misses"])]),
+        ("fitflex_response_cache_hits_total", "counter", "Response cache hits", [({}, response_stats["hits"])]),
+        ("fitflex_response_cache_misses_total", "counter", "Response cache misses", [({}, response_stats["misses"])]),
+        ("fitflex_password_hash_pending", "gauge", "Password hash jobs in flight", [({}, passwords.stats()["pending"])]),
+        ("fitflex_group_commit_workouts_total", "counter", "Workout creates handled by the group-commit writer",
+         [({"outcome": outcome}, commit_stats[outcome]) for outcome in ("written", "failed", "rejected")]),
+        ("fitflex_group_commit_batches_total", "counter", "Group commits", [({}, commit_stats["batches"])]),
+        ("fitflex_group_commit_pending", "gauge", "Workout creates waiting for the group-commit writer", [({}, commit_stats["pending"])]),
+    ]
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
 # Register a new user
-@router.post("/register")
-def register(user: schema.UserCreate, db: Session = Depends(get_db)):
-    if crud.get_user_by_email(db, user.email):
+@router.post("/register", response_model=schema.UserOut)
+async def register(user: schema.UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(crud.get_user_by_email, db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db, user)
+    password_hash = await passwords.hash_password(user.password)
+    return await run_in_threadpool(crud.create_user, db, user, password_hash)
 
 # Login and generate JWT
 @router.post("/login", response_model=schema.Token)
-def login(user: schema.UserLogin, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, user.email)
-    if not db_user or not crud.verify_password(user.password, db_user.password_hash):
+async def login(user: schema.UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, user.email)
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await passwords.verify_password(user.password, db_user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash was made with a different bcrypt cost; upgrade it now that we know the password
+        await run_in_threadpool(crud.set_password_hash, db, db_user, new_hash)
 
-    to_encode = {
-        "sub": db_user.username,
-        "exp": datetime.utcnow() + timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
-    }
-
-    token = jwt.encode(to_encode, config.SECRET_KEY, algorithm=config.ALGORITHM)
+    token = auth_cache.create_access_token(db_user)
 
     return {
         "access_token": token,
@@ -77,98 +122,184 @@ def reset_password_request(payload: ResetPasswordRequest, db: Session = Depends(
 
 # Password reset handler
 @router.post("/reset-password")
-def reset_password(data: ResetPasswordData, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == data.email).first()
+async def reset_password(data: ResetPasswordData, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(crud.get_user_by_email, db, data.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    user.password_hash = pwd_context.hash(data.new_password)
-    db.commit()
+    password_hash = await passwords.hash_password(data.new_password)
+    await run_in_threadpool(crud.set_password_hash, db, user, password_hash)
     return {"message": "Password reset successfully."}
 
 # Create a new workout
-@router.post("/workouts")
-def create_workout(workout: schema.WorkoutCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return crud.create_workout(db, user_id=current_user.id, workout_data=workout)
+@router.post("/workouts", response_model=schema.WorkoutOut)
+async def create_workout(workout: schema.WorkoutCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    try:
+        # Async so waiting on the group-commit writer doesn't hold a threadpool thread
+        if group_commit.enabled():
+            return await group_commit.create_workout(user_id, workout)
+        return await run_in_threadpool(crud.create_workout, db, user_id=user_id, workout_data=workout)
+    except crud.UnknownExerciseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-# Get all workouts
-@router.get("/workouts")
-def get_workouts(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return crud.get_user_workouts(db, user_id=current_user.id)
+# Create many workouts in one transaction. Workouts with unknown exercise ids are reported
+# in errors by their position; the rest are saved.
+@router.post("/workouts/batch", response_model=schema.WorkoutBatchResult, response_class=ORJSONResponse)
+def create_workouts(batch: schema.WorkoutBatch, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    created, errors = crud.create_workouts(db, user_id, batch.workouts)
+    return batch_response(created, errors)
+
+def batch_response(created, errors):
+    return ORJSONResponse({"created": created, "errors": [{"index": i, "error": e} for i, e in errors]})
+
+# Bulk import workout history from a CSV or NDJSON request body (see importer.py)
+@router.post("/workouts/import")
+async def import_workouts(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    if format is None:
+        format = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+    try:
+        return await importer.import_stream(db, user_id, request.stream(), format)
+    except importer.ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Get all workouts, newest first. Pass ?limit= to page; the next page's cursor is sent in X-Next-Cursor.
+# crud's dicts already have the WorkoutOut shape, so the history is encoded straight to orjson
+# (by response_cache) instead of going through response_model validation and jsonable_encoder.
+# Skipping the validation is most of the win; orjson's encoder itself is about 3x faster than
+# pydantic-core's dump_json (benchmarks/serialization.py).
+@router.get("/workouts", response_model=List[schema.WorkoutOut], response_class=ORJSONResponse)
+def get_workouts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    def build():
+        try:
+            workouts, next_cursor = crud.get_user_workouts(
+                db, user_id=user_id, limit=limit, cursor=cursor, date_from=date_from, date_to=date_to
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return history_page(workouts, next_cursor)
+    return response_cache.respond(request, user_id, build)
+
+def history_page(workouts, next_cursor: Optional[str]):
+    return workouts, {"X-Next-Cursor": next_cursor} if next_cursor else None
+
+# Stream the user's history as CSV or NDJSON (see exporter.py)
+@router.get("/workouts/export")
+def export_workouts(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    user_id: int = Depends(get_current_user_id)
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        exporter.stream_export(user_id, format, date_from, date_to),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="workouts.{format}"'},
+    )
 
 # Get a specific workout
-@router.get("/workouts/{workout_id}")
-def get_workout(workout_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    workout = crud.get_workout_by_id(db, workout_id)
-    if not workout or workout.user_id != current_user.id:
+@router.get("/workouts/{workout_id}", response_model=schema.WorkoutOut)
+def get_workout(workout_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    workout = crud.get_workout_by_id(db, workout_id, user_id)
+    if not workout:
         raise HTTPException(status_code=404, detail="Workout not found")
     return workout
 
 # Update a workout
-@router.put("/workouts/{workout_id}")
-def update_workout(workout_id: int, workout_data: schema.WorkoutUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    updated_workout = crud.update_workout(db, workout_id, current_user.id, workout_data)
+@router.put("/workouts/{workout_id}", response_model=schema.WorkoutMessage)
+def update_workout(workout_id: int, workout_data: schema.WorkoutUpdate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    try:
+        updated_workout = crud.update_workout(db, workout_id, user_id, workout_data)
+    except crud.UnknownExerciseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if not updated_workout:
         raise HTTPException(status_code=404, detail="Workout not found")
     return {"message": "Workout updated successfully", "workout_id": workout_id}
 
+# Partially update a workout (name, date or individual exercise entries)
+@router.patch("/workouts/{workout_id}", response_model=schema.WorkoutOut)
+def patch_workout(workout_id: int, patch: schema.WorkoutPatch, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    try:
+        workout = crud.patch_workout(db, workout_id, user_id, patch)
+    except (crud.UnknownExerciseError, crud.InvalidWorkoutPatch) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not workout:
+        raise HTTPException(status_code=404, detail="Workout not found")
+    return workout
+
 # Delete a workout
-@router.delete("/workouts/{workout_id}")
-def delete_workout(workout_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return crud.delete_workout(db, workout_id, current_user.id)
+@router.delete("/workouts/{workout_id}", response_model=schema.WorkoutMessage)
+def delete_workout(workout_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    if not crud.delete_workout(db, workout_id, user_id):
+        raise HTTPException(status_code=404, detail="Workout not found")
+    return {"message": "Workout deleted successfully", "workout_id": workout_id}
+
+# Get all exercises (pre-serialized catalog; conditional requests get a 304)
+@router.get("/exercises", response_model=List[schema.ExerciseOut])
+def get_exercises(request: Request, db: Session = Depends(get_db)):
+    return catalog_response(request, catalog.get_catalog(db))
+
+# Autocomplete over the catalog, ranked; matching ignores case and punctuation
+@router.get("/exercises/search", response_model=List[schema.ExerciseOut])
+def search_exercises(
+    q: str = "",
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    return exercise_search.search(db, q, category, limit)
 
-# Get all exercises
-@router.get("/exercises")
-def get_exercises(db: Session = Depends(get_db)):
-    return db.query(models.Exercise).all()
+def catalog_response(request: Request, snapshot: catalog.CatalogSnapshot):
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or snapshot.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
-# Seed sample exercises
-@router.post("/seed-exercises")
+# Seed the default exercise catalog (idempotent; see catalog_loader.py)
+@router.post("/seed-exercises", response_model=schema.CatalogLoadResult)
 def seed_exercises(db: Session = Depends(get_db)):
-    exercises = [
-        {"name": "Squats", "category": "Strength", "description": "Lower body strength"},
-        {"name": "Push-ups", "category": "Strength", "description": "Upper body strength"},
-        {"name": "Jumping Jacks", "category": "Cardio", "description": "Full-body cardio warm-up"},
-        {"name": "Plank", "category": "Core", "description": "Core stability"},
-    ]
-    added = 0
-    for ex in exercises:
-        if not db.query(models.Exercise).filter_by(name=ex["name"]).first():
-            db.add(models.Exercise(**ex))
-            added += 1
-    db.commit()
-    return {"message": f"{added} exercises seeded."}
+    result = catalog_loader.load_catalog(db, catalog_loader.default_catalog())
+    return {"message": f"{result['inserted']} exercises seeded.", **result}
 
 # Get current user info
-@router.get("/me")
-def read_users_me(current_user: User = Depends(get_current_user)):
+@router.get("/me", response_model=schema.UserOut)
+def read_users_me(current_user: auth_cache.Principal = Depends(get_current_user)):
     return current_user
 
-# Dashboard stats
-@router.get("/dashboard/stats")
-def get_dashboard_stats(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    total_workouts = db.query(models.Workout).filter(models.Workout.user_id == current_user.id).count()
-    total_exercises = db.query(models.WorkoutExercise).join(models.Workout).filter(models.Workout.user_id == current_user.id).count()
-    total_time_spent = db.query(func.sum(models.WorkoutExercise.duration)).join(models.Workout).filter(models.Workout.user_id == current_user.id).scalar() or 0
-    latest_workout = db.query(models.Workout).filter(models.Workout.user_id == current_user.id).order_by(models.Workout.date.desc()).first()
+# Dashboard stats, read from the per-user rollup row (and cached until the user's next write)
+@router.get("/dashboard/stats", response_model=schema.DashboardStats)
+def get_dashboard_stats(request: Request, user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    return response_cache.respond(request, user_id, lambda: crud.get_dashboard_stats(db, user_id))
 
-    return {
-        "total_workouts": total_workouts,
-        "total_exercises": total_exercises,
-        "total_time_spent_minutes": total_time_spent,
-        "latest_workout": {
-            "name": latest_workout.name if latest_workout else None,
-            "date": latest_workout.date.strftime("%Y-%m-%d") if latest_workout else None
-        }
-    }
+@router.get("/dashboard/time-by-type", response_model=List[schema.TimeByType])
+def time_by_workout_name(request: Request, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    return response_cache.respond(request, user_id, lambda: crud.get_time_by_workout_name(db, user_id))
+
+# Minutes and sessions per day/week/month; closed buckets come from the trends cache
+@router.get("/dashboard/trends", response_model=List[schema.TrendBucket])
+def get_trends(
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    exercise_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    try:
+        return crud.get_trends(db, user_id, bucket, date_from=date_from, date_to=date_to, exercise_id=exercise_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/dashboard/time-by-type")
-def time_by_workout_name(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    results = (
-        db.query(Workout.name, func.sum(WorkoutExercise.duration).label("total_time"))
-        .join(WorkoutExercise, Workout.id == WorkoutExercise.workout_id)
-        .filter(Workout.user_id == current_user.id)
-        .group_by(Workout.name)
-        .all()
-    )
-    return [{"workoutType": r[0], "timeSpent": r[1]} for r in results]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, validator, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, validator, EmailStr
 from typing import List, Optional
 from datetime import date
 
@@ -63,4 +63,125 @@ class WorkoutUpdate(BaseModel):
         try:
             return datetime.strptime(v, '%Y-%m-%d').date()
         except ValueError:
-            raise ValueError('Date must be in YYYY-MM-DD format')
\ No newline at end of file
+            raise ValueError('Date must be in YYYY-MM-DD format')
+
+# Partial edits for PATCH /workouts/{id}. Entries with an id change or remove that
+# exercise row; entries without one are added.
+class WorkoutExercisePatch(BaseModel):
+    id: Optional[int] = None
+    exercise_id: Optional[int] = None
+    duration: Optional[int] = None
+    remove: bool = False
+
+    @validator('duration')
+    def validate_duration(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError('Duration must be positive')
+        return v
+
+
+class WorkoutPatch(BaseModel):
+    name: Optional[str] = None
+    date: Optional[str] = None
+    exercises: Optional[List[WorkoutExercisePatch]] = None
+
+    @validator('date')
+    def validate_date(cls, v):
+        if v is None:
+            return v
+        from datetime import datetime
+        try:
+            return datetime.strptime(v, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('Date must be in YYYY-MM-DD format')
+
+
+# POST /workouts/batch
+MAX_BATCH_WORKOUTS = 500
+
+class WorkoutBatch(BaseModel):
+    workouts: List[WorkoutCreate] = Field(min_length=1, max_length=MAX_BATCH_WORKOUTS)
+
+
+# Response models. Routes that return ORM rows or auth_cache.Principal read them with
+# from_attributes; crud's serialized dicts validate as-is.
+class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    email: str
+    age: Optional[int] = None
+    weight: Optional[float] = None
+    gender: Optional[str] = None
+
+
+class ExerciseOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    category: Optional[str] = None
+    description: Optional[str] = None
+
+
+class WorkoutExerciseOut(BaseModel):
+    id: int
+    name: Optional[str] = None
+    duration: int
+    exercise_id: int
+
+
+class WorkoutOut(BaseModel):
+    id: int
+    name: str
+    date: date
+    user_id: int
+    exercises: List[WorkoutExerciseOut]
+    total_duration: int
+
+
+class WorkoutBatchError(BaseModel):
+    index: int
+    error: str
+
+
+class WorkoutBatchResult(BaseModel):
+    created: List[WorkoutOut]
+    errors: List[WorkoutBatchError]
+
+
+class WorkoutMessage(BaseModel):
+    message: str
+    workout_id: int
+
+
+class LatestWorkout(BaseModel):
+    name: Optional[str] = None
+    date: Optional[str] = None
+
+
+class DashboardStats(BaseModel):
+    total_workouts: int
+    total_exercises: int
+    total_time_spent_minutes: int
+    latest_workout: LatestWorkout
+
+
+class TimeByType(BaseModel):
+    workoutType: str
+    timeSpent: int
+
+
+class TrendBucket(BaseModel):
+    bucket: str
+    minutes: int
+    sessions: int
+
+
+class CatalogLoadResult(BaseModel):
+    message: str
+    inserted: int
+    updated: int
+    unchanged: int
+    rejected: int
@@ -0,0 +1,199 @@
+# app/trends.py
+# Time-bucketed training trends for GET /dashboard/trends.
+#
+# Minutes and sessions per day/week/month are aggregated in SQL (date_trunc on Postgres,
+# date() modifiers on SQLite). Buckets before the one containing today are closed: they
+# only change when a workout dated inside them is written, so they are cached per user
+# and each request queries just the open bucket (and anything dated after it). crud calls
+# invalidate() with the dates a committed write touched, which marks only those buckets
+# for recomputation. The cache is process-local; TRENDS_CACHE_TTL_SECONDS bounds how long
+# another worker can serve a bucket changed elsewhere.
+#
+# Archived months (see archive.py) are added in: monthly totals come from their summaries,
+# day/week buckets and per-exercise trends from their compressed raw rows.
+from datetime import date, timedelta
+import threading
+from typing import Optional
+
+from sqlalchemy import Date, and_, cast, func, literal_column, or_
+from sqlalchemy.orm import Session
+
+from . import archive, config, models
+from .cache import TTLCache
+
+BUCKETS = ("day", "week", "month")
+MAX_BUCKETS = 3660
+
+
+def bucket_start(day: date, bucket: str):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def next_bucket(start: date, bucket: str):
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+# SQL expression for the first day of each workout's bucket (weeks start on Monday)
+def bucket_expression(dialect: str, bucket: str):
+    if dialect == "postgresql":
+        # Inlined rather than bound: GROUP BY must repeat the exact SELECT expression
+        return cast(func.date_trunc(literal_column(f"'{bucket}'"), models.Workout.date), Date)
+    modifiers = {"day": (), "week": ("weekday 0", "-6 days"), "month": ("start of month",)}[bucket]
+    return func.date(models.Workout.date, *modifiers, type_=Date)
+
+# {bucket_start: (minutes, sessions)}. since/before bound workout dates (before is exclusive)
+# and are bucket starts; starts limits the query to those buckets.
+def aggregate(db: Session, user_id: int, bucket: str, exercise_id: Optional[int] = None,
+              since: Optional[date] = None, before: Optional[date] = None, starts=None):
+    totals = _aggregate_hot(db, user_id, bucket, exercise_id, since, before, starts)
+    for start, (minutes, sessions) in _aggregate_archived(db, user_id, bucket, exercise_id, since, before, starts).items():
+        hot_minutes, hot_sessions = totals.get(start, (0, 0))
+        totals[start] = (hot_minutes + minutes, hot_sessions + sessions)
+    return totals
+
+def _aggregate_archived(db: Session, user_id: int, bucket: str, exercise_id: Optional[int],
+                        since: Optional[date], before: Optional[date], starts):
+    if starts is not None:
+        if not starts:
+            return {}
+        since = max(since, min(starts)) if since else min(starts)
+        last = next_bucket(max(starts), bucket)
+        before = min(before, last) if before else last
+    if bucket == "month" and exercise_id is None:
+        totals = archive.monthly_totals(db, user_id, since, before)
+    else:
+        totals = {}
+        for _, _, day, entries in archive.archived_workouts(db, user_id, since, before):
+            durations = [duration for entry_exercise_id, duration in entries if exercise_id in (None, entry_exercise_id)]
+            if exercise_id is not None and not durations:
+                continue
+            start = bucket_start(day, bucket)
+            minutes, sessions = totals.get(start, (0, 0))
+            totals[start] = (minutes + sum(durations), sessions + 1)
+    if starts is not None:
+        totals = {start: value for start, value in totals.items() if start in starts}
+    return totals
+
+def _aggregate_hot(db: Session, user_id: int, bucket: str, exercise_id: Optional[int],
+                   since: Optional[date], before: Optional[date], starts):
+    start_column = bucket_expression(db.get_bind().dialect.name, bucket).label("bucket")
+    query = db.query(
+        start_column,
+        func.coalesce(func.sum(models.WorkoutExercise.duration), 0),
+        func.count(func.distinct(models.Workout.id)),
+    ).filter(models.Workout.user_id == user_id)
+    if exercise_id is None:
+        query = query.outerjoin(models.WorkoutExercise, models.WorkoutExercise.workout_id == models.Workout.id)
+    else:
+        query = query.join(models.WorkoutExercise, models.WorkoutExercise.workout_id == models.Workout.id) \
+            .filter(models.WorkoutExercise.exercise_id == exercise_id)
+    if since:
+        query = query.filter(models.Workout.date >= since)
+    if before:
+        query = query.filter(models.Workout.date < before)
+    if starts is not None:
+        query = query.filter(or_(*(
+            and_(models.Workout.date >= start, models.Workout.date < next_bucket(start, bucket)) for start in starts
+        )))
+    return {start: (minutes, sessions) for start, minutes, sessions in query.group_by(start_column)}
+
+
+# Closed buckets for one (bucket, exercise_id) of a user
+class _Series:
+    def __init__(self, closed_before: date, buckets: dict):
+        self.closed_before = closed_before
+        self.buckets = buckets
+        self.stale = set()
+
+class _UserTrends:
+    def __init__(self):
+        # Bumped by every invalidation, so a read that raced a write does not store its result
+        self.generation = 0
+        self.series = {}
+
+_cache = TTLCache(config.TRENDS_CACHE_SIZE, config.TRENDS_CACHE_TTL_SECONDS)
+_lock = threading.Lock()
+
+
+def _closed_buckets(db: Session, user_id: int, bucket: str, exercise_id: Optional[int], open_start: date):
+    key = (bucket, exercise_id)
+    with _lock:
+        user = _cache.get(user_id)
+        if user is None:
+            user = _UserTrends()
+            _cache.set(user_id, user)
+        generation = user.generation
+        series = user.series.get(key)
+        if series is not None and not series.stale and series.closed_before == open_start:
+            return series.buckets
+        stale = set(series.stale) if series is not None else set()
+
+    # Database work happens outside the lock
+    if series is None:
+        buckets = aggregate(db, user_id, bucket, exercise_id, before=open_start)
+    else:
+        buckets = {start: value for start, value in series.buckets.items() if start not in stale}
+        if stale:
+            buckets.update(aggregate(db, user_id, bucket, exercise_id, before=open_start, starts=stale))
+        if series.closed_before < open_start:
+            # Buckets that closed since the series was cached
+            buckets.update(aggregate(db, user_id, bucket, exercise_id, since=series.closed_before, before=open_start))
+
+    with _lock:
+        if user.generation == generation:
+            user.series[key] = _Series(open_start, buckets)
+    return buckets
+
+def invalidate(user_id: int, dates):
+    with _lock:
+        user = _cache.peek(user_id)
+        if user is None:
+            return
+        user.generation += 1
+        for (bucket, _), series in user.series.items():
+            for day in dates:
+                start = bucket_start(day, bucket)
+                if start < series.closed_before:
+                    series.stale.add(start)
+
+def clear():
+    _cache.clear()
+
+def stats():
+    return _cache.stats()
+
+
+# One entry per bucket from date_from (or the first workout) to date_to (or the open
+# bucket), zero-filled. Buckets are whole: date_from/date_to select the buckets they fall in.
+def get_trends(db: Session, user_id: int, bucket: str = "week", date_from: Optional[date] = None,
+               date_to: Optional[date] = None, exercise_id: Optional[int] = None):
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    open_start = bucket_start(date.today(), bucket)
+    first = bucket_start(date_from, bucket) if date_from else None
+    last = bucket_start(date_to, bucket) if date_to else None
+
+    totals = {}
+    if first is None or first < open_start:
+        totals.update(_closed_buckets(db, user_id, bucket, exercise_id, open_start))
+    if last is None or last >= open_start:
+        totals.update(aggregate(db, user_id, bucket, exercise_id, since=open_start))
+
+    if first is None:
+        first = min(totals, default=open_start)
+    if last is None:
+        last = max([open_start, *totals])
+    results, start = [], first
+    while start <= last:
+        if len(results) >= MAX_BUCKETS:
+            raise ValueError(f"Range covers more than {MAX_BUCKETS} buckets; narrow from/to or use a larger bucket")
+        minutes, sessions = totals.get(start, (0, 0))
+        results.append({"bucket": start.isoformat(), "minutes": minutes, "sessions": sessions})
+        start = next_bucket(start, bucket)
+    return results
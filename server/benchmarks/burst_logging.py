@@ -0,0 +1,77 @@
+# benchmarks/burst_logging.py
+# End-of-class burst: every member of a class posts their workout at once. Compares
+# one POST /workouts per workout committing alone, the same posts with the group-commit
+# writer on (GROUP_COMMIT_WINDOW_MS), and each client sending its workouts in one
+# POST /workouts/batch.
+#
+#   cd server && python -m benchmarks.burst_logging --clients 100 --rounds 5
+#   cd server && python -m benchmarks.burst_logging --database-url postgresql://localhost/fitflex_bench
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from .common import login, ms, percentile, running_server, wait_until_up
+
+
+def workout(i: int):
+    return {"name": "Class", "date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", "exercises": [{"exercise_id": 1 + i % 4, "duration": 20 + i % 30}]}
+
+def class_member(i: int):
+    return {"username": f"member{i}", "email": f"member{i}@example.com", "password": "member-pw", "age": 30, "weight": 70.0, "gender": "f"}
+
+async def burst(client, members, rounds: int, batched: bool):
+    latencies, errors = [], 0
+
+    async def post(headers, i):
+        nonlocal errors
+        start = time.perf_counter()
+        if batched:
+            response = await client.post("/workouts/batch", headers=headers, json={"workouts": [workout(i + r) for r in range(rounds)]})
+        else:
+            response = await client.post("/workouts", headers=headers, json=workout(i))
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for r in range(1 if batched else rounds):
+        await asyncio.gather(*[post(headers, i + r) for i, headers in enumerate(members)])
+    elapsed = time.perf_counter() - start
+    return {
+        "workouts_per_s": round(len(members) * rounds / elapsed, 1),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "errors": errors,
+    }
+
+async def run(base_url, args, batched: bool):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await wait_until_up(client)
+        await client.post("/seed-exercises")
+        members = [await login(client, class_member(i)) for i in range(args.clients)]
+        # Warm-up post so first-write rollup backfills aren't measured
+        await asyncio.gather(*[client.post("/workouts", headers=headers, json=workout(0)) for headers in members])
+        return await burst(client, members, args.rounds, batched)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Burst of workout posts: per-request commits vs group commit vs batch endpoint")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5, help="workouts per client")
+    parser.add_argument("--window-ms", default="5", help="GROUP_COMMIT_WINDOW_MS for the group-commit run")
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file per run")
+    args = parser.parse_args()
+
+    modes = [
+        ("per-request commit", {"GROUP_COMMIT_WINDOW_MS": "0"}, False),
+        ("group commit", {"GROUP_COMMIT_WINDOW_MS": args.window_ms}, False),
+        ("batch endpoint", {"GROUP_COMMIT_WINDOW_MS": "0"}, True),
+    ]
+    for name, env, batched in modes:
+        with running_server({**env, "DB_MODE": "async", "BCRYPT_ROUNDS": "4"}, database_url=args.database_url) as base_url:
+            result = asyncio.run(run(base_url, args, batched))
+        print(f"{name:20} " + "  ".join(f"{k}={v}" for k, v in result.items()))
@@ -0,0 +1,47 @@
+# benchmarks/catalog_load.py
+# Times app/catalog_loader.py on a generated catalog: a first load into an empty table,
+# an idempotent reload of the same file, and a reload with a tenth of the rows changed.
+#
+#   cd server && python -m benchmarks.catalog_load --rows 100000
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+CATEGORIES = ["Strength", "Cardio", "Core", "Mobility", "Plyometrics"]
+
+
+def write_catalog(path: str, rows: int, changed_every: int = 0):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "category", "description"])
+        for i in range(rows):
+            description = f"Generated movement {i}" + (" (revised)" if changed_every and i % changed_every == 0 else "")
+            writer.writerow([f"Movement {i}", CATEGORIES[i % len(CATEGORIES)], description])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time bulk catalog loads")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    # app.config reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'catalog.db')}"
+    from app import catalog_loader, config, migrations
+
+    migrations.upgrade(config.engine)
+    original, revised = os.path.join(workdir, "catalog.csv"), os.path.join(workdir, "revised.csv")
+    write_catalog(original, args.rows)
+    write_catalog(revised, args.rows, changed_every=10)
+
+    for label, path in (("first load", original), ("reload", original), ("10% changed", revised)):
+        db = config.SessionLocal()
+        try:
+            start = time.perf_counter()
+            result = catalog_loader.load_catalog(db, catalog_loader.read_catalog_file(path))
+            print(f"{label:12} {time.perf_counter() - start:6.2f}s  {result}")
+        finally:
+            db.close()
@@ -0,0 +1,65 @@
+# benchmarks/common.py
+# Helpers shared by the benchmark scripts: run the app under uvicorn against a
+# throwaway SQLite database and summarise latency samples.
+import asyncio
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+
+import httpx
+
+BENCH_USER = {"username": "bench", "email": "bench@example.com", "password": "bench-pw", "age": 30, "weight": 70.0, "gender": "f"}
+# Password of every user benchmarks/synthetic.py generates
+SYNTHETIC_PASSWORD = "synthetic-pw"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+# Yields the base URL of a uvicorn process started with extra environment variables
+@contextlib.contextmanager
+def running_server(env=None, database_url=None, workers=1):
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, METRICS_ENABLED="true", **(env or {}))
+    subprocess.run([sys.executable, "-m", "app.migrations", "upgrade"], env=env, check=True, stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.terminate()
+        server.wait()
+
+async def wait_until_up(client):
+    for _ in range(100):
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+# Registers (if needed) and logs in the benchmark user; returns auth headers
+async def login(client, user=BENCH_USER):
+    await client.post("/register", json=user)
+    response = await client.post("/login", json={"email": user["email"], "password": user["password"]})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,73 @@
+# benchmarks/compare.py
+# Compares two benchmarks/run.py reports and exits non-zero when the candidate
+# regressed: p95 latency or throughput worse by more than --threshold percent, or
+# more SQL statements per request (by QUERY_SLACK or more) on any endpoint.
+#
+#   cd server && python -m benchmarks.compare base.json candidate.json --threshold 10
+import argparse
+import json
+import sys
+
+# Averages wobble with the request mix (e.g. cache hits); a whole extra statement is real
+QUERY_SLACK = 0.5
+
+
+def _pct_change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+def compare(base, candidate, threshold: float):
+    rows, regressions = [], []
+    for endpoint, new in candidate["endpoints"].items():
+        old = base["endpoints"].get(endpoint)
+        if old is None:
+            continue
+        p95 = _pct_change(old["p95_ms"], new["p95_ms"])
+        rps = _pct_change(old["rps"], new["rps"])
+        problems = []
+        if p95 is not None and p95 > threshold:
+            problems.append(f"p95 +{p95:.0f}%")
+        if rps is not None and rps < -threshold:
+            problems.append(f"throughput {rps:.0f}%")
+        if old["queries_per_request"] is not None and new["queries_per_request"] is not None \
+                and new["queries_per_request"] - old["queries_per_request"] >= QUERY_SLACK:
+            problems.append(f"queries {old['queries_per_request']} -> {new['queries_per_request']}")
+        if new["errors"] > old["errors"]:
+            problems.append(f"errors {old['errors']} -> {new['errors']}")
+        rows.append((endpoint, old, new, p95, rps, problems))
+        if problems:
+            regressions.append((endpoint, problems))
+    return rows, regressions
+
+def _fmt(value, suffix=""):
+    return "-" if value is None else f"{value:+.0f}{suffix}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag regressions between two benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed p95/throughput change in percent")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(base, candidate, args.threshold)
+    print(f"{'endpoint':34} {'p95 ms':>17} {'Δp95':>6} {'req/s':>17} {'Δrps':>6} {'queries':>11}")
+    for endpoint, old, new, p95, rps, problems in rows:
+        print(
+            f"{endpoint:34} {str(old['p95_ms']):>8}→{str(new['p95_ms']):<8} {_fmt(p95, '%'):>6} "
+            f"{old['rps']:>8}→{new['rps']:<8} {_fmt(rps, '%'):>6} "
+            f"{str(old['queries_per_request']):>5}→{str(new['queries_per_request']):<5}"
+            + ("  REGRESSION" if problems else "")
+        )
+    if regressions:
+        print(f"\n{len(regressions)} endpoint(s) regressed beyond {args.threshold:g}%:")
+        for endpoint, problems in regressions:
+            print(f"  {endpoint}: {', '.join(problems)}")
+        sys.exit(1)
+    print("\nNo regressions.")
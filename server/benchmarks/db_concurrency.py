@@ -0,0 +1,77 @@
+# benchmarks/db_concurrency.py
+# Sync vs async database mode under rising concurrency. Starts uvicorn with DB_MODE=sync
+# and DB_MODE=async against a local SQLite file (aiosqlite in async mode), then drives a
+# read-heavy mix of /workouts, /dashboard/stats and POST /workouts at each concurrency level.
+#
+#   cd server && python -m benchmarks.db_concurrency --concurrency 8 64 256 --seconds 5
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from .common import login, ms, percentile, running_server, wait_until_up
+
+
+async def prepare(client, workouts):
+    headers = await login(client)
+    await client.post("/seed-exercises")
+    for i in range(workouts):
+        await client.post("/workouts", headers=headers, json={
+            "name": random.choice(["Leg day", "Cardio", "Push"]),
+            "date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "exercises": [{"exercise_id": 1 + i % 4, "duration": 10 + i % 30}],
+        })
+    return headers
+
+async def drive(client, headers, concurrency, seconds):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            roll = random.random()
+            start = time.perf_counter()
+            if roll < 0.6:
+                response = await client.get("/workouts", params={"limit": 20}, headers=headers)
+            elif roll < 0.9:
+                response = await client.get("/dashboard/stats", headers=headers)
+            else:
+                response = await client.post("/workouts", headers=headers, json={
+                    "name": "Cardio", "date": "2024-06-01", "exercises": [{"exercise_id": 2, "duration": 15}],
+                })
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return {
+        "rps": round(len(latencies) / seconds, 1),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "errors": errors,
+    }
+
+async def run_mode(base_url, args):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await wait_until_up(client)
+        headers = await prepare(client, args.workouts)
+        return {c: await drive(client, headers, c, args.seconds) for c in args.concurrency}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare DB_MODE=sync and DB_MODE=async under concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 64, 256])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workouts", type=int, default=200, help="workouts created before measuring")
+    args = parser.parse_args()
+
+    for mode in ("sync", "async"):
+        with running_server({"DB_MODE": mode, "BCRYPT_ROUNDS": "4"}) as base_url:
+            results = asyncio.run(run_mode(base_url, args))
+        for concurrency, result in results.items():
+            print(f"{mode:>5} c={concurrency:<4} " + "  ".join(f"{k}={v}" for k, v in result.items()))
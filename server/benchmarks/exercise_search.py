@@ -0,0 +1,57 @@
+# benchmarks/exercise_search.py
+# Search latency of the exercise index (app/exercise_search.py) on a generated catalog,
+# plus the cost of a full build and of an incremental sync after adding exercises.
+#
+#   cd server && python -m benchmarks.exercise_search --size 10000
+import argparse
+import random
+import time
+
+from app.catalog import CatalogExercise
+from app.exercise_search import ExerciseIndex
+from app.catalog_loader import default_catalog
+
+from .common import percentile
+
+MODIFIERS = ["Incline", "Decline", "Seated", "Standing", "Single-Arm", "Kettlebell", "Cable", "Banded", "Weighted", "Paused", "Tempo", "Wide-Grip"]
+QUERIES = ["", "pushups", "push", "squat", "bench pr", "curl", "deadlfit", "row", "kettlebell sw", "jump", "plank", "plnk", "zzz", "single arm"]
+
+
+def generate_catalog(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    bases = default_catalog()
+    exercises = []
+    for i in range(size):
+        base = rng.choice(bases)
+        name = " ".join(rng.sample(MODIFIERS, rng.randint(0, 2)) + [base["name"]]) + (f" {i}" if i >= len(bases) else "")
+        exercises.append(CatalogExercise(id=i + 1, name=name, category=base["category"], description=base["description"]))
+    return exercises
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time exercise search on a generated catalog")
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    exercises = generate_catalog(args.size)
+    by_id = {e.id: e for e in exercises}
+    index = ExerciseIndex()
+    start = time.perf_counter()
+    index.sync(1, by_id)
+    print(f"build: {len(index)} exercises in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    added = {**by_id, **{e.id + args.size: CatalogExercise(e.id + args.size, e.name + " Hold", e.category, e.description) for e in exercises[:10]}}
+    start = time.perf_counter()
+    index.sync(2, added)
+    print(f"incremental sync (+10): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'query':16} {'hits':>5} {'p50 ms':>8} {'p99 ms':>8}  top result")
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            results = index.search(query, limit=20)
+            samples.append(time.perf_counter() - start)
+        top = results[0].name if results else "-"
+        print(f"{query:16} {len(results):>5} {percentile(samples, 50) * 1000:>8.3f} {percentile(samples, 99) * 1000:>8.3f}  {top}")
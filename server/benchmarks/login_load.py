@@ -0,0 +1,70 @@
+# benchmarks/login_load.py
+# Mixed-load benchmark: a burst of /login calls alongside steady /workouts reads.
+# Starts uvicorn against a throwaway SQLite database once per hashing mode and reports
+# login latency percentiles next to the throughput the other route kept.
+#
+#   cd server && python -m benchmarks.login_load --logins 32 --readers 16 --seconds 10
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from .common import BENCH_USER, login, ms, percentile, running_server, wait_until_up
+
+
+async def run_load(base_url, logins, readers, seconds):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await wait_until_up(client)
+        headers = await login(client)
+        credentials = {"email": BENCH_USER["email"], "password": BENCH_USER["password"]}
+
+        login_latencies, rejected, reads = [], 0, 0
+        deadline = time.perf_counter() + seconds
+
+        async def login_loop():
+            nonlocal rejected
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/login", json=credentials)
+                if response.status_code == 429:
+                    rejected += 1
+                    await asyncio.sleep(0.05)
+                else:
+                    login_latencies.append(time.perf_counter() - start)
+
+        async def read_loop():
+            nonlocal reads
+            while time.perf_counter() < deadline:
+                await client.get("/workouts", headers=headers)
+                reads += 1
+
+        await asyncio.gather(*[login_loop() for _ in range(logins)], *[read_loop() for _ in range(readers)])
+
+    return {
+        "logins": len(login_latencies),
+        "rejected": rejected,
+        "login_p50_ms": ms(percentile(login_latencies, 50)),
+        "login_p99_ms": ms(percentile(login_latencies, 99)),
+        "workouts_rps": round(reads / seconds, 1),
+    }
+
+def run_mode(hash_workers, args):
+    env = {"PASSWORD_HASH_WORKERS": str(hash_workers), "BCRYPT_ROUNDS": str(args.rounds)}
+    with running_server(env) as base_url:
+        return asyncio.run(run_load(base_url, args.logins, args.readers, args.seconds))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=16, help="concurrent GET /workouts clients")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--pool-workers", type=int, default=min(os.cpu_count() or 1, 4))
+    args = parser.parse_args()
+
+    for label, workers in (("inline", 0), (f"pool({args.pool_workers})", args.pool_workers)):
+        result = run_mode(workers, args)
+        print(f"{label:>10}: " + "  ".join(f"{k}={v}" for k, v in result.items()))
@@ -0,0 +1,100 @@
+# benchmarks/query_plans.py
+# Query-plan check. Loads a large synthetic dataset, runs the history, workout detail and
+# dashboard code paths while capturing the SQL they issue, and EXPLAINs each statement.
+# Exits 1 when any of them scans workouts or workout_exercises instead of using an index.
+#
+#   cd server && python -m benchmarks.query_plans --users 20 --workouts 5000
+#   cd server && python -m benchmarks.query_plans --database-url postgresql://localhost/fitflex_bench --skip-generate
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+from sqlalchemy import event, text
+
+# SQLite: "SCAN workouts" (also "SCAN workouts USING INDEX", a full index walk); Postgres: "Seq Scan on workouts"
+FULL_SCAN = re.compile(r"\b(SCAN|Seq Scan on) (workouts|workout_exercises)\b")
+
+
+def capture_statements(engine, run):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+def explain(engine, statement, parameters):
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    # SQLite rows are (id, parent, notused, detail); Postgres rows are single plan lines
+    return [row[-1] for row in rows]
+
+def check(engine, user_id: int):
+    from app import crud, rollups
+    from app.config import SessionLocal
+
+    db = SessionLocal()
+    try:
+        def run():
+            _, next_cursor = crud.get_user_workouts(db, user_id, limit=50)
+            crud.get_user_workouts(db, user_id, limit=50, cursor=next_cursor)
+            workout_id = rollups.latest_workout(db, user_id).id
+            crud.get_workout_by_id(db, workout_id, user_id)
+            crud.get_dashboard_stats(db, user_id)
+            crud.get_time_by_workout_name(db, user_id)
+            rollups.compute_user_stats(db, user_id)
+
+        statements = capture_statements(engine, run)
+    finally:
+        db.close()
+
+    failures = 0
+    for statement, parameters in statements:
+        if not re.search(r"\b(workouts|workout_exercises)\b", statement):
+            continue
+        plan = explain(engine, statement, parameters)
+        scans = [line for line in plan if FULL_SCAN.search(line)]
+        failures += bool(scans)
+        print(("FULL SCAN  " if scans else "ok         ") + " ".join(statement.split())[:140])
+        for line in plan:
+            print(f"    {line}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the history and dashboard queries on a large synthetic dataset")
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    parser.add_argument("--skip-generate", action="store_true", help="reuse synthetic data already in the database")
+    parser.add_argument("--users", type=int, default=20, help="with only a few users the planner rightly prefers scans")
+    parser.add_argument("--workouts", type=int, default=5000, help="workouts per synthetic user")
+    args = parser.parse_args()
+
+    # app.config reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+    from app import config, migrations, models
+    from benchmarks import synthetic
+
+    migrations.upgrade(config.engine)
+    db = config.SessionLocal()
+    try:
+        if not args.skip_generate:
+            synthetic.generate(db, args.users, args.workouts, years=5)
+        user_id = db.query(models.User.id).filter(models.User.email == synthetic.synthetic_email(0)).scalar()
+        # Refresh planner statistics for the freshly loaded rows
+        db.execute(text("ANALYZE"))
+        db.commit()
+    finally:
+        db.close()
+
+    failures = check(config.engine, user_id)
+    print(f"\n{failures} statement(s) scan workouts or workout_exercises." if failures else "\nAll statements use indexes.")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,266 @@
+# benchmarks/run.py
+# Load-test runner. Fills a database with synthetic history (benchmarks/synthetic.py),
+# starts the app against it and drives every route with a weighted mix at a fixed
+# concurrency. Writes p50/p95/p99 latency, throughput and SQL statements per request
+# (from /metrics) for each endpoint as JSON. Compare two runs with benchmarks/compare.py.
+#
+#   cd server && python -m benchmarks.run --users 5 --workouts 2000 --concurrency 16 --duration 20 -o base.json
+#   cd server && python -m benchmarks.run --database-url postgresql://localhost/fitflex_bench --skip-generate -o pg.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from .common import SYNTHETIC_PASSWORD, ms, percentile, running_server, wait_until_up
+
+# (endpoint, weight); endpoint names match the route templates reported by /metrics
+SCENARIOS = [
+    ("POST /login", 2),
+    ("GET /workouts", 20),
+    ("GET /workouts/{workout_id}", 10),
+    ("POST /workouts", 8),
+    ("PUT /workouts/{workout_id}", 4),
+    ("PATCH /workouts/{workout_id}", 4),
+    ("DELETE /workouts/{workout_id}", 3),
+    ("POST /workouts/batch", 2),
+    ("POST /workouts/import", 1),
+    ("GET /workouts/export", 1),
+    ("GET /dashboard/stats", 15),
+    ("GET /dashboard/time-by-type", 15),
+    ("GET /dashboard/trends", 5),
+    ("GET /exercises", 10),
+    ("GET /exercises/search", 8),
+    ("GET /me", 5),
+]
+SEARCH_QUERIES = ["push", "squat", "bench pr", "curl", "plnk", "row", "jump", ""]
+
+# Path converters ("{workout_id:int}" on the async router) are dropped to match SCENARIOS
+CONVERTER = re.compile(r"{(\w+):\w+}")
+QUERY_METRIC = re.compile(r'^fitflex_http_request_queries_(sum|count)\{method="(\w+)",route="([^"]+)"\} ([0-9.e+-]+)$')
+
+
+def generate_data(database_url, users, workouts, years, seed):
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.synthetic", "--users", str(users), "--workouts", str(workouts),
+         "--years", str(years), "--seed", str(seed)],
+        env=dict(os.environ, DATABASE_URL=database_url),
+        check=True,
+    )
+
+# {"GET /workouts": (sum, count)} from the Prometheus text
+async def scrape_query_counts(client):
+    totals = {}
+    for line in (await client.get("/metrics")).text.splitlines():
+        match = QUERY_METRIC.match(line)
+        if match:
+            kind, method, route, value = match.groups()
+            key = method + " " + CONVERTER.sub(r"{\1}", route)
+            sums = totals.setdefault(key, [0.0, 0.0])
+            sums[0 if kind == "sum" else 1] += float(value)
+    return totals
+
+
+class VirtualUser:
+    def __init__(self, client, email, rng):
+        self.client = client
+        self.email = email
+        self.rng = rng
+        self.headers = {}
+        self.workout_ids = []
+        self.created_ids = []
+        self.exercise_ids = []
+
+    async def login(self):
+        response = await self.client.post("/login", json={"email": self.email, "password": SYNTHETIC_PASSWORD})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    async def prepare(self):
+        await self.login()
+        workouts = (await self.client.get("/workouts", params={"limit": 200}, headers=self.headers)).json()
+        self.workout_ids = [w["id"] for w in workouts]
+        self.exercise_ids = [e["id"] for e in (await self.client.get("/exercises")).json()]
+
+    def _workout_body(self):
+        return {
+            "name": self.rng.choice(["Leg day", "Push", "Cardio"]),
+            "date": f"2024-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d}",
+            "exercises": [
+                {"exercise_id": self.rng.choice(self.exercise_ids), "duration": self.rng.randint(5, 60)}
+                for _ in range(self.rng.randint(1, 4))
+            ],
+        }
+
+    def _import_body(self, rows: int = 50):
+        lines = ["name,date,exercise_id,duration"]
+        for _ in range(rows):
+            workout = self._workout_body()
+            lines.append(f"{workout['name']},{workout['date']},{self.rng.choice(self.exercise_ids)},{self.rng.randint(5, 60)}")
+        return "\n".join(lines) + "\n"
+
+    async def run(self, endpoint):
+        client, headers = self.client, self.headers
+        if endpoint == "POST /login":
+            return await self.login()
+        if endpoint == "GET /workouts":
+            return await client.get("/workouts", params={"limit": 50}, headers=headers)
+        if endpoint == "GET /workouts/{workout_id}":
+            return await client.get(f"/workouts/{self.rng.choice(self.workout_ids)}", headers=headers)
+        if endpoint == "POST /workouts":
+            response = await client.post("/workouts", json=self._workout_body(), headers=headers)
+            if response.status_code == 200 and response.json().get("id"):
+                self.created_ids.append(response.json()["id"])
+            return response
+        if endpoint == "POST /workouts/batch":
+            body = {"workouts": [self._workout_body() for _ in range(self.rng.randint(5, 20))]}
+            response = await client.post("/workouts/batch", json=body, headers=headers)
+            if response.status_code == 200:
+                self.created_ids += [w["id"] for w in response.json()["created"]]
+            return response
+        if endpoint == "POST /workouts/import":
+            return await client.post("/workouts/import", content=self._import_body(), headers={**headers, "Content-Type": "text/csv"})
+        if endpoint == "GET /workouts/export":
+            # The last 90 days, read to the end like a download
+            params = {"from": (date.today() - timedelta(days=90)).isoformat()}
+            async with client.stream("GET", "/workouts/export", params=params, headers=headers) as response:
+                await response.aread()
+            return response
+        if endpoint == "GET /dashboard/trends":
+            return await client.get("/dashboard/trends", params={"bucket": self.rng.choice(["week", "month"])}, headers=headers)
+        if endpoint == "GET /exercises/search":
+            return await client.get("/exercises/search", params={"q": self.rng.choice(SEARCH_QUERIES)})
+        if endpoint == "PUT /workouts/{workout_id}":
+            return await client.put(f"/workouts/{self.rng.choice(self.workout_ids)}", json=self._workout_body(), headers=headers)
+        if endpoint == "PATCH /workouts/{workout_id}":
+            return await client.patch(f"/workouts/{self.rng.choice(self.workout_ids)}", json={"name": "Patched"}, headers=headers)
+        if endpoint == "DELETE /workouts/{workout_id}":
+            # Prefer workouts this run created (POST /workouts only reports ids once it returns them)
+            if self.created_ids:
+                workout_id = self.created_ids.pop()
+            elif len(self.workout_ids) > 1:
+                workout_id = self.workout_ids.pop(self.rng.randrange(len(self.workout_ids)))
+            else:
+                return None
+            return await client.delete(f"/workouts/{workout_id}", headers=headers)
+        if endpoint == "GET /exercises":
+            return await client.get("/exercises")
+        method, path = endpoint.split(" ", 1)
+        return await client.request(method, path, headers=headers)
+
+
+async def drive(base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await wait_until_up(client)
+        rng = random.Random(args.seed)
+        users = [VirtualUser(client, f"synthetic{i % args.users}@example.com", random.Random(rng.random())) for i in range(args.concurrency)]
+        for user in users:
+            await user.prepare()
+
+        queries_before = await scrape_query_counts(client)
+        samples = {endpoint: [] for endpoint, _ in SCENARIOS}
+        errors = {endpoint: 0 for endpoint, _ in SCENARIOS}
+        endpoints = [endpoint for endpoint, _ in SCENARIOS]
+        weights = [weight for _, weight in SCENARIOS]
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        async def loop(user):
+            while time.perf_counter() < deadline:
+                endpoint = user.rng.choices(endpoints, weights)[0]
+                start = time.perf_counter()
+                response = await user.run(endpoint)
+                if response is None:
+                    continue
+                if response.status_code >= 400:
+                    errors[endpoint] += 1
+                else:
+                    samples[endpoint].append(time.perf_counter() - start)
+
+        await asyncio.gather(*[loop(user) for user in users])
+        elapsed = time.perf_counter() - started
+        queries_after = await scrape_query_counts(client)
+
+    results = {}
+    for endpoint in endpoints:
+        latencies = samples[endpoint]
+        before = queries_before.get(endpoint, [0.0, 0.0])
+        after = queries_after.get(endpoint, [0.0, 0.0])
+        requests = after[1] - before[1]
+        results[endpoint] = {
+            "count": len(latencies),
+            "errors": errors[endpoint],
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "queries_per_request": round((after[0] - before[0]) / requests, 2) if requests else None,
+        }
+    all_latencies = [s for endpoint in endpoints for s in samples[endpoint]]
+    total = {
+        "count": len(all_latencies),
+        "errors": sum(errors.values()),
+        "rps": round(len(all_latencies) / elapsed, 2),
+        "p50_ms": ms(percentile(all_latencies, 50)),
+        "p95_ms": ms(percentile(all_latencies, 95)),
+        "p99_ms": ms(percentile(all_latencies, 99)),
+    }
+    return results, total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive every route with synthetic users and report per-endpoint latency")
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    parser.add_argument("--base-url", help="use an already running server instead of starting one")
+    parser.add_argument("--skip-generate", action="store_true", help="reuse synthetic data already in the database")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--workouts", type=int, default=2000, help="workouts per synthetic user")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of measured load")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server environment, e.g. DB_MODE=async")
+    parser.add_argument("-o", "--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    if not args.skip_generate and not args.base_url:
+        generate_data(database_url, args.users, args.workouts, args.years, args.seed)
+
+    server_env = dict(item.split("=", 1) for item in args.env)
+    if args.base_url:
+        endpoints, total = asyncio.run(drive(args.base_url, args))
+    else:
+        with running_server(server_env, database_url=database_url) as base_url:
+            endpoints, total = asyncio.run(drive(base_url, args))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "database": database_url.split("://", 1)[0],
+            "users": args.users,
+            "workouts_per_user": args.workouts,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "server_env": server_env,
+        },
+        "endpoints": endpoints,
+        "total": total,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.output}: {total['count']} requests, {total['rps']} req/s, p95 {total['p95_ms']} ms")
+    else:
+        print(text)
@@ -0,0 +1,92 @@
+# benchmarks/serialization.py
+# Cost of turning a page of workout history into a response body, per 1k workouts:
+# FastAPI's default path with no response_model (jsonable_encoder + json.dumps, what
+# GET /workouts used to do), the response_model path (validate against WorkoutOut, dump,
+# json.dumps), pydantic-core's own JSON encoder with and without that validation, and the
+# ORJSONResponse path the history now takes. Checks that all paths produce the same JSON.
+#
+#   cd server && python -m benchmarks.serialization --workouts 1000
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app import schema
+
+from .common import percentile
+
+
+# Dicts shaped like crud.serialize_workout's output
+def generate_workouts(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    workouts = []
+    for i in range(count):
+        exercises = [
+            {"id": i * 10 + j, "name": f"Exercise {rng.randint(1, 60)}", "duration": rng.randint(5, 60), "exercise_id": rng.randint(1, 60)}
+            for j in range(rng.randint(1, 6))
+        ]
+        workouts.append({
+            "id": i + 1,
+            "name": rng.choice(["Leg Day", "Upper Body", "Cardio", "Full Body"]),
+            "date": date(2024, 1, 1) + timedelta(days=i),
+            "user_id": 1,
+            "exercises": exercises,
+            "total_duration": sum(e["duration"] for e in exercises),
+        })
+    return workouts
+
+
+history = TypeAdapter(List[schema.WorkoutOut])
+
+def encode_default(workouts):
+    return JSONResponse(jsonable_encoder(workouts)).body
+
+def encode_response_model(workouts):
+    return JSONResponse(history.dump_python(history.validate_python(workouts), mode="json")).body
+
+def encode_response_model_dump_json(workouts):
+    return history.dump_json(history.validate_python(workouts))
+
+# Takes already-validated models, so only the encoding is timed
+def encode_dump_json(models):
+    return history.dump_json(models)
+
+def encode_orjson(workouts):
+    return ORJSONResponse(workouts).body
+
+# (name, encode, prepare): prepare turns the dicts into encode's input outside the timing
+PATHS = [
+    ("jsonable_encoder + json", encode_default, None),
+    ("response_model + json", encode_response_model, None),
+    ("response_model dump_json", encode_response_model_dump_json, None),
+    ("dump_json (no validation)", encode_dump_json, history.validate_python),
+    ("orjson", encode_orjson, None),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time response serialization of workout history")
+    parser.add_argument("--workouts", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    workouts = generate_workouts(args.workouts)
+    expected = json.loads(encode_default(workouts))
+    print(f"{'path':26} {'p50 ms':>8} {'p99 ms':>8} {'per 1k ms':>10} {'KiB':>7}")
+    for name, encode, prepare in PATHS:
+        payload = prepare(workouts) if prepare else workouts
+        body = encode(payload)
+        assert json.loads(body) == expected, f"{name} produced different JSON"
+        samples = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            encode(payload)
+            samples.append(time.perf_counter() - start)
+        p50 = percentile(samples, 50) * 1000
+        print(f"{name:26} {p50:>8.2f} {percentile(samples, 99) * 1000:>8.2f} {p50 * 1000 / args.workouts:>10.2f} {len(body) / 1024:>7.0f}")
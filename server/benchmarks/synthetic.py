@@ -0,0 +1,89 @@
+# benchmarks/synthetic.py
+# Synthetic data generator: N users, each with thousands of workouts spread over
+# several years, written through the app's models and tables in bulk. Every user
+# gets the same password (SYNTHETIC_PASSWORD) so the load runner can log in as them.
+#
+#   cd server && DATABASE_URL=sqlite:///bench.db python -m benchmarks.synthetic --users 20 --workouts 2000
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from app import config, models, rollups, catalog_loader, migrations
+from app.passwords import pwd_context
+
+from .common import SYNTHETIC_PASSWORD
+
+WORKOUT_NAMES = ["Leg day", "Push", "Pull", "Cardio", "Core", "Full body", "Mobility", "HIIT"]
+INSERT_BATCH = 5000
+
+
+def synthetic_email(index: int):
+    return f"synthetic{index}@example.com"
+
+def ensure_exercises(db):
+    catalog_loader.load_catalog(db, catalog_loader.default_catalog())
+    return [exercise_id for (exercise_id,) in db.query(models.Exercise.id)]
+
+def _insert_workouts(db, rows):
+    table = models.Workout.__table__
+    result = db.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+def generate(db, users: int, workouts_per_user: int, years: float, seed: int = 0):
+    rng = random.Random(seed)
+    exercise_ids = ensure_exercises(db)
+    # One hash shared by every synthetic user; hashing thousands of passwords would dominate
+    password_hash = pwd_context.hash(SYNTHETIC_PASSWORD)
+    span_days = max(int(years * 365), 1)
+    today = date.today()
+
+    first_index = db.query(models.User).filter(models.User.email.like("synthetic%@example.com")).count()
+    user_ids = []
+    for index in range(first_index, first_index + users):
+        user = models.User(
+            username=f"synthetic{index}", email=synthetic_email(index), password_hash=password_hash,
+            age=rng.randint(18, 70), weight=round(rng.uniform(50, 110), 1), gender=rng.choice(["female", "male"]),
+        )
+        db.add(user)
+        db.flush()
+        user_ids.append(user.id)
+
+        workout_rows = [
+            {
+                "user_id": user.id,
+                "name": rng.choice(WORKOUT_NAMES),
+                "date": today - timedelta(days=rng.randrange(span_days)),
+            }
+            for _ in range(workouts_per_user)
+        ]
+        for start in range(0, len(workout_rows), INSERT_BATCH):
+            batch = workout_rows[start:start + INSERT_BATCH]
+            workout_ids = _insert_workouts(db, batch)
+            exercise_rows = [
+                {"workout_id": workout_id, "exercise_id": rng.choice(exercise_ids), "duration": rng.randint(5, 60)}
+                for workout_id in workout_ids
+                for _ in range(rng.randint(1, 6))
+            ]
+            db.execute(models.WorkoutExercise.__table__.insert(), exercise_rows)
+        rollups.rebuild_user_rollups(db, user.id)
+        db.commit()
+    return user_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the configured database with synthetic users and workouts")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--workouts", type=int, default=2000, help="workouts per user")
+    parser.add_argument("--years", type=float, default=3, help="history span")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    migrations.upgrade(config.engine)
+    db = config.SessionLocal()
+    try:
+        start = time.perf_counter()
+        user_ids = generate(db, args.users, args.workouts, args.years, args.seed)
+        print(f"Created {len(user_ids)} users x {args.workouts} workouts in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()